@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+示例：对比默认 JSON 配置与 genes-common Celery 调优配置的任务消息吞吐
+
+使用进程内的 Redis 替身（列表队列）模拟 broker，只测量消息路径：
+序列化 -> 压缩 -> 入队 -> 出队 -> 解压 -> 反序列化。
+需要安装 celery（kombu）；安装 msgpack 后额外测量 msgpack 序列化：pip install msgpack
+"""
+
+import random
+import time
+from collections import deque
+
+from kombu import compression, serialization
+
+from genes_common import settings
+from genes_common.celery_utils import register_threshold_compression
+
+try:
+    import msgpack  # noqa: F401
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+
+class FakeRedis:
+    """最小的 Redis 列表替身，记录写入字节数"""
+
+    def __init__(self):
+        self._lists = {}
+        self.bytes_written = 0
+
+    def lpush(self, key, value):
+        self.bytes_written += len(value)
+        self._lists.setdefault(key, deque()).appendleft(value)
+
+    def rpop(self, key):
+        return self._lists[key].pop()
+
+
+def variant_payload(n_variants):
+    """构造典型的变异注释任务参数"""
+    rng = random.Random(n_variants)
+    variants = [
+        {
+            "chrom": f"chr{rng.randint(1, 22)}",
+            "pos": rng.randint(1, 248_000_000),
+            "ref": rng.choice("ACGT"),
+            "alt": rng.choice("ACGT"),
+            "gene": f"GENE{rng.randint(1, 20000)}",
+            "transcript": f"NM_{rng.randint(100000, 999999)}.{rng.randint(1, 9)}",
+            "af": round(rng.random(), 6),
+            "depth": rng.randint(10, 500),
+            "qual": round(rng.uniform(20, 60), 2),
+        }
+        for _ in range(n_variants)
+    ]
+    return {"sample_id": f"S{n_variants:06d}", "variants": variants}
+
+
+def run_profile(name, serializer, compression_name, payload, n_tasks):
+    broker = FakeRedis()
+    body = ((), {"payload": payload}, {})
+    start = time.perf_counter()
+    for _ in range(n_tasks):
+        content_type, content_encoding, data = serialization.dumps(body, serializer=serializer)
+        header = None
+        if compression_name:
+            data, header = compression.compress(data, compression_name)
+        broker.lpush("celery", data)
+        raw = broker.rpop("celery")
+        if header:
+            raw = compression.decompress(raw, header)
+        serialization.loads(raw, content_type, content_encoding, accept=[content_type])
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {name:<10} {n_tasks / elapsed:>10.0f} tasks/s"
+        f"  {broker.bytes_written / n_tasks / 1024:>9.1f} KiB/task"
+    )
+
+
+def main():
+    """主函数"""
+    config = settings.get_celery_config()
+    # 压缩默认关闭，这里显式注册按大小压缩的 zlib 编码用于对比
+    threshold_zlib = register_threshold_compression("zlib", settings.external.celery_compression_threshold)
+    print("Celery message throughput (in-process Redis stand-in)")
+    print(f"Tuned profile: serializer={config['task_serializer']}, compression={config['task_compression']}")
+    print("=" * 50)
+
+    for n_variants, n_tasks in ((10, 20000), (1000, 2000), (20000, 100)):
+        payload = variant_payload(n_variants)
+        print(f"\n{n_variants} variants per task:")
+        run_profile("default", "json", None, payload, n_tasks)
+        run_profile(
+            "tuned", config["task_serializer"], config["task_compression"], payload, n_tasks
+        )
+        run_profile("zlib", config["task_serializer"], threshold_zlib, payload, n_tasks)
+        if MSGPACK_AVAILABLE:
+            run_profile("msgpack", "msgpack", threshold_zlib, payload, n_tasks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+示例：JWT 验证吞吐基准（每秒验证次数）
+
+对比每次完整 HMAC 验证与已验证 token LRU 命中两种路径。
+"""
+
+import time
+
+from genes_common.auth import TokenVerifier
+
+
+def bench(name, func, tokens, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for token in tokens:
+            func(token)
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<24} {rounds * len(tokens) / elapsed:>12,.0f} verifications/s")
+
+
+def main():
+    """主函数"""
+    print("JWT verification throughput")
+    print("=" * 50)
+    verifier = TokenVerifier(secret_key="benchmark-secret-key", algorithm="HS256")
+    tokens = [
+        verifier.encode({"sub": f"user-{i}", "roles": ["reader"], "jti": f"token-{i}"}, expires_in=3600)
+        for i in range(1000)
+    ]
+
+    uncached = TokenVerifier(secret_key="benchmark-secret-key", algorithm="HS256", cache_size=0)
+    bench("full verification", uncached.verify, tokens, 20)
+
+    for token in tokens:
+        verifier.verify(token)
+    bench("cached (LRU hit)", verifier.verify, tokens, 20)
+
+    batch = verifier.verify_many
+    start = time.perf_counter()
+    for _ in range(20):
+        batch(tokens)
+    elapsed = time.perf_counter() - start
+    print(f"  {'cached, verify_many':<24} {20 * len(tokens) / elapsed:>12,.0f} verifications/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+示例：对比默认 dict 解码与原始 BSON 读取模式的 CPU 开销
+
+不需要 MongoDB 服务：直接使用驱动从服务端收到的 BSON 字节（一个批次），
+分别测量 "解码为 dict 再序列化 JSON" 与 "RawBSONDocument 直接转 JSON" 的吞吐。
+安装 python-bsonjs 后原始模式使用 C 实现的转换。
+"""
+
+import json
+import random
+import time
+
+import bson
+from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+from genes_common.mongo_json import BSONJS_AVAILABLE, stream_json_array
+
+RAW_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def gene_document(rng, index):
+    """构造接近真实的基因文档"""
+    start = rng.randint(1, 240_000_000)
+    transcripts = []
+    for t in range(rng.randint(2, 12)):
+        exons = []
+        position = start
+        for e in range(rng.randint(3, 30)):
+            length = rng.randint(50, 400)
+            exons.append({"number": e + 1, "start": position, "end": position + length})
+            position += length + rng.randint(200, 20000)
+        transcripts.append({
+            "id": f"ENST{rng.randint(10**10, 10**11 - 1)}",
+            "refseq": f"NM_{rng.randint(100000, 999999)}.{rng.randint(1, 9)}",
+            "biotype": "protein_coding",
+            "canonical": t == 0,
+            "exons": exons,
+        })
+    return {
+        "_id": ObjectId(),
+        "symbol": f"GENE{index}",
+        "hgnc_id": f"HGNC:{rng.randint(1, 50000)}",
+        "ensembl_id": f"ENSG{rng.randint(10**10, 10**11 - 1)}",
+        "entrez_id": rng.randint(1, 10**6),
+        "chrom": f"chr{rng.randint(1, 22)}",
+        "start": start,
+        "end": position,
+        "strand": rng.choice(["+", "-"]),
+        "aliases": [f"ALIAS{rng.randint(1, 10**5)}" for _ in range(rng.randint(0, 6))],
+        "description": " ".join(rng.choice(["kinase", "receptor", "binding", "protein", "domain", "family"]) for _ in range(30)),
+        "transcripts": transcripts,
+        "pubmed_ids": [rng.randint(10**6, 4 * 10**7) for _ in range(rng.randint(5, 80))],
+    }
+
+
+def bench(name, func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        output = func()
+    elapsed = time.perf_counter() - start
+    size = f"  ({len(output) / 1024:.0f} KiB JSON)" if isinstance(output, bytes) else ""
+    print(f"  {name:<32} {elapsed / rounds * 1000:>8.2f} ms/batch{size}")
+
+
+def main():
+    """主函数"""
+    rng = random.Random(42)
+    documents = [gene_document(rng, i) for i in range(500)]
+    batch = b"".join(bson.encode(document) for document in documents)
+    print(f"Batch of {len(documents)} gene documents, {len(batch) / 1024:.0f} KiB BSON")
+    print(f"bsonjs available: {BSONJS_AVAILABLE}")
+    print("=" * 50)
+
+    def dict_json_util():
+        return json_util.dumps(bson.decode_all(batch), json_options=json_util.RELAXED_JSON_OPTIONS).encode("utf-8")
+
+    def dict_json_default():
+        return json.dumps(bson.decode_all(batch), default=str).encode("utf-8")
+
+    def raw_stream():
+        return b"".join(stream_json_array(bson.decode_all(batch, RAW_OPTIONS)))
+
+    def dict_field_access():
+        return [doc["symbol"] for doc in bson.decode_all(batch)]
+
+    def raw_field_access():
+        return [doc["symbol"] for doc in bson.decode_all(batch, RAW_OPTIONS)]
+
+    bench("dict + json_util.dumps", dict_json_util, 20)
+    bench("dict + json.dumps(default=str)", dict_json_default, 20)
+    bench("raw BSON -> JSON stream", raw_stream, 20)
+    print()
+    bench("dict, read one field", dict_field_access, 20)
+    bench("raw, read one field", raw_field_access, 20)
+
+
+if __name__ == "__main__":
+    main()
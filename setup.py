@@ -17,6 +17,12 @@ setup(
         "sqlalchemy>=2.0.0",
         "oss2==2.17.0",  # Aliyun OSS SDK
     ],
+    extras_require={
+        "mongo": ["zstandard>=0.21.0"],  # zstd wire compression for MongoDB profiles
+        "raw": ["python-bsonjs>=0.2.0"],  # C BSON -> JSON for mongo_json
+        "export": ["pyarrow>=12.0.0", "zstandard>=0.21.0"],  # Parquet / zstd parts for oss_export
+        "celery": ["celery>=5.3.0", "msgpack>=1.0.0"],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -12,9 +12,11 @@ __version__ = "1.0.0"
 from .config import Settings, settings
 from .db import (
     get_mongo_client, get_mongo_db, 
+    get_mongo_raw_db, get_mongo_raw_collection,
     get_redis_client, 
     get_mysql_engine, get_mysql_session, get_mysql_connection,
-    close_connections
+    close_connections,
+    warmup, check_readiness,
 )
 from .logging import setup_logging
 from .aliyun_oss import OSSClient
@@ -24,11 +26,15 @@ __all__ = [
     "settings", 
     "get_mongo_client",
     "get_mongo_db",
+    "get_mongo_raw_db",
+    "get_mongo_raw_collection",
     "get_redis_client",
     "get_mysql_engine",
     "get_mysql_session", 
     "get_mysql_connection",
     "close_connections",
+    "warmup",
+    "check_readiness",
     "setup_logging",
     "OSSClient",
 ] 
\ No newline at end of file
@@ -59,11 +59,23 @@ class OSSClient:
         res = self.bucket.put_object_from_file(object_name, local_path)
         return res.status == 200
 
+    def upload_bytes(self, data: bytes, object_name: str) -> bool:
+        logger.debug("Uploading %d bytes to OSS as %s", len(data), object_name)
+        res = self.bucket.put_object(object_name, data)
+        return res.status == 200
+
     def download_file(self, object_name: str, local_path: str) -> bool:
         logger.debug("Downloading %s to %s", object_name, local_path)
         res = self.bucket.get_object_to_file(object_name, local_path)
         return res.status == 200
 
+    def download_bytes(self, object_name: str) -> bytes:
+        logger.debug("Downloading OSS object %s into memory", object_name)
+        return self.bucket.get_object(object_name).read()
+
+    def object_exists(self, object_name: str) -> bool:
+        return self.bucket.object_exists(object_name)
+
     def delete_object(self, object_name: str) -> bool:
         logger.debug("Deleting OSS object %s", object_name)
         res = self.bucket.delete_object(object_name)
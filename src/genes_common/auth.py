@@ -0,0 +1,340 @@
+"""Fast JWT verification for per-request authentication.
+
+``TokenVerifier`` verifies HMAC-signed (HS256/HS384/HS512) bearer tokens
+using the ``SecurityConfig`` secret and algorithm. The HMAC key schedule is
+computed once and copied per verification, and tokens that already passed
+verification are kept in a bounded LRU keyed by the SHA-256 of the token, so
+a repeated token costs one hash and one dict lookup until its ``exp``.
+
+Revocation is optional: ``RedisRevocationSet`` stores revoked token ids in a
+Redis sorted set scored by expiry. Cached tokens are re-checked at most every
+``JWT_REVOCATION_CHECK_INTERVAL`` seconds, and ``verify_many`` checks a whole
+batch in one pipeline round trip. The check fails closed: when Redis cannot
+be reached, the tokens that needed it raise ``RevocationUnavailableError``.
+
+Tokens without ``exp`` are accepted unless ``JWT_REQUIRE_EXP`` is set, but
+they are never cached.
+
+Example:
+    from genes_common.auth import get_token_verifier, InvalidTokenError
+
+    verifier = get_token_verifier()
+    try:
+        claims = verifier.verify(bearer_token)
+    except InvalidTokenError:
+        ...  # 401
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import redis
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "InvalidTokenError",
+    "ExpiredTokenError",
+    "RevokedTokenError",
+    "RevocationUnavailableError",
+    "RedisRevocationSet",
+    "TokenVerifier",
+    "get_token_verifier",
+]
+
+_ALGORITHMS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+_B64URL_RE = re.compile(r"[A-Za-z0-9_-]*")
+
+
+class InvalidTokenError(ValueError):
+    """Token is malformed or its signature does not verify."""
+
+
+class ExpiredTokenError(InvalidTokenError):
+    """Token ``exp`` has passed (or ``nbf`` is in the future)."""
+
+
+class RevokedTokenError(InvalidTokenError):
+    """Token id is in the revocation set."""
+
+
+class RevocationUnavailableError(InvalidTokenError):
+    """The revocation set could not be checked; the token is rejected."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(segment: str) -> bytes:
+    # urlsafe_b64decode 会静默丢弃非字母表字符，先严格校验
+    if not _B64URL_RE.fullmatch(segment):
+        raise ValueError("Invalid base64url segment")
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class RedisRevocationSet:
+    """Revoked token ids in a Redis sorted set scored by token expiry."""
+
+    def __init__(self, redis_client: Any = None, key: str = "genes:jwt:revoked") -> None:
+        if redis_client is None:
+            from .db import get_redis_client
+            redis_client = get_redis_client()
+        self.redis = redis_client
+        self.key = key
+
+    def revoke(self, token_id: str, expires_at: Optional[float] = None) -> None:
+        """Revoke ``token_id`` until ``expires_at`` (epoch seconds; forever if None)."""
+        score = expires_at if expires_at is not None else float("inf")
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.zadd(self.key, {token_id: score})
+        # 顺便清理已过期的吊销记录
+        pipeline.zremrangebyscore(self.key, "-inf", time.time())
+        pipeline.execute()
+
+    def revoked(self, token_ids: Sequence[str]) -> List[bool]:
+        """Check many token ids in one round trip."""
+        if not token_ids:
+            return []
+        pipeline = self.redis.pipeline(transaction=False)
+        for token_id in token_ids:
+            pipeline.zscore(self.key, token_id)
+        return [score is not None for score in pipeline.execute()]
+
+
+class TokenVerifier:
+    """Verify and issue HMAC JWTs with a verified-token LRU."""
+
+    def __init__(
+        self,
+        secret_key: Optional[str] = None,
+        algorithm: Optional[str] = None,
+        cache_size: Optional[int] = None,
+        leeway: Optional[int] = None,
+        revocation: Optional[RedisRevocationSet] = None,
+        revocation_check_interval: Optional[float] = None,
+        require_exp: Optional[bool] = None,
+    ) -> None:
+        config = settings.security
+        self.algorithm = algorithm or config.jwt_algorithm
+        if self.algorithm not in _ALGORITHMS:
+            raise ValueError(f"Unsupported JWT algorithm: {self.algorithm} (supported: {', '.join(_ALGORITHMS)})")
+        self.cache_size = cache_size if cache_size is not None else config.jwt_verify_cache_size
+        self.leeway = leeway if leeway is not None else config.jwt_leeway_seconds
+        self.require_exp = require_exp if require_exp is not None else config.jwt_require_exp
+        self.revocation = revocation
+        self.revocation_check_interval = (
+            revocation_check_interval if revocation_check_interval is not None
+            else config.jwt_revocation_check_interval
+        )
+
+        # 预先计算 HMAC 密钥（ipad/opad），每次验证只需 copy
+        self._mac = hmac.new((secret_key or config.jwt_secret_key).encode("utf-8"), digestmod=_ALGORITHMS[self.algorithm])
+        self._header = _b64encode(json.dumps(
+            {"alg": self.algorithm, "typ": "JWT"}, separators=(",", ":")
+        ).encode("utf-8"))
+        # token sha256 -> [claims, token id, revocation checked at]
+        self._cache: "OrderedDict[bytes, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Issuing
+    # ------------------------------------------------------------------
+    def encode(self, claims: Dict[str, Any], expires_in: Optional[int] = None) -> str:
+        """Sign ``claims``; adds ``iat`` and ``exp`` (default: JWT_ACCESS_TOKEN_EXPIRE_MINUTES)."""
+        now = int(time.time())
+        payload = dict(claims)
+        payload.setdefault("iat", now)
+        if "exp" not in payload:
+            if expires_in is None:
+                expires_in = settings.security.jwt_access_token_expire_minutes * 60
+            payload["exp"] = now + expires_in
+        signing_input = f"{self._header}.{_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))}"
+        return f"{signing_input}.{_b64encode(self._sign(signing_input))}"
+
+    def _sign(self, signing_input: str) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input.encode("ascii"))
+        return mac.digest()
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the claims of ``token`` or raise ``InvalidTokenError``."""
+        return self.verify_many([token])[0]
+
+    def verify_many(
+        self, tokens: Sequence[str], return_exceptions: bool = False
+    ) -> List[Union[Dict[str, Any], InvalidTokenError]]:
+        """Verify a batch of tokens, checking revocation in one round trip.
+
+        With ``return_exceptions=True`` failures are returned in place of the
+        claims instead of raising the first one. If the revocation set is
+        unreachable, tokens due for a check fail with
+        ``RevocationUnavailableError``.
+        """
+        now = time.time()
+        results: List[Any] = [None] * len(tokens)
+        to_check: List[int] = []
+        entries: List[Optional[list]] = [None] * len(tokens)
+        keys: List[bytes] = []
+
+        for i, token in enumerate(tokens):
+            key = hashlib.sha256(token.encode("utf-8")).digest()
+            keys.append(key)
+            try:
+                entry = self._cached(key, now)
+                if entry is None:
+                    claims = self._decode(token, now)
+                    entry = [claims, claims.get("jti") or key.hex(), None]
+                entries[i] = entry
+                if self.revocation is not None and (
+                    entry[2] is None or now - entry[2] >= self.revocation_check_interval
+                ):
+                    to_check.append(i)
+                else:
+                    results[i] = entry[0]
+            except InvalidTokenError as e:
+                results[i] = e
+
+        if to_check:
+            try:
+                revoked = self.revocation.revoked([entries[i][1] for i in to_check])
+            except redis.RedisError as e:
+                logger.error(f"Token revocation check failed, rejecting {len(to_check)} token(s): {e}")
+                revoked = [None] * len(to_check)
+            for i, is_revoked in zip(to_check, revoked):
+                if is_revoked is None:
+                    results[i] = RevocationUnavailableError("Token revocation check is unavailable")
+                elif is_revoked:
+                    self._evict(keys[i])
+                    results[i] = RevokedTokenError("Token has been revoked")
+                else:
+                    entries[i][2] = now
+                    results[i] = entries[i][0]
+
+        for i, result in enumerate(results):
+            if isinstance(result, InvalidTokenError):
+                if not return_exceptions:
+                    raise result
+            else:
+                # 没有 exp 的 token 不缓存，避免永久有效
+                if "exp" in result:
+                    self._store(keys[i], entries[i])
+                # 返回副本，避免调用方修改缓存中的 claims
+                results[i] = dict(result)
+        return results
+
+    def revoke(self, token: str) -> None:
+        """Revoke ``token`` (requires a revocation set) and drop it from the cache."""
+        if self.revocation is None:
+            raise ValueError("Token revocation is not configured")
+        claims = self._decode(token, time.time(), check_time=False)
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        self.revocation.revoke(claims.get("jti") or key.hex(), claims.get("exp"))
+        self._evict(key)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _decode(self, token: str, now: float, check_time: bool = True) -> Dict[str, Any]:
+        signing_input, _, signature_segment = token.rpartition(".")
+        header_segment, _, payload_segment = signing_input.partition(".")
+        if not header_segment or not payload_segment:
+            raise InvalidTokenError("Malformed token")
+        try:
+            header = json.loads(_b64decode(header_segment))
+            signature = _b64decode(signature_segment)
+            expected = self._sign(signing_input)
+        except (ValueError, UnicodeEncodeError) as e:
+            raise InvalidTokenError("Malformed token") from e
+        if not isinstance(header, dict) or header.get("alg") != self.algorithm:
+            raise InvalidTokenError("Unexpected token algorithm")
+        if not hmac.compare_digest(signature, expected):
+            raise InvalidTokenError("Signature verification failed")
+        try:
+            claims = json.loads(_b64decode(payload_segment))
+        except ValueError as e:
+            raise InvalidTokenError("Malformed token payload") from e
+        if not isinstance(claims, dict):
+            raise InvalidTokenError("Malformed token payload")
+        for claim in ("exp", "nbf"):
+            if claim in claims and not _is_number(claims[claim]):
+                raise InvalidTokenError(f"Token {claim} claim must be a number")
+        if self.require_exp and "exp" not in claims:
+            raise InvalidTokenError("Token has no exp claim")
+        if check_time:
+            self._check_time(claims, now)
+        return claims
+
+    def _check_time(self, claims: Dict[str, Any], now: float) -> None:
+        # exp/nbf 的类型已在 _decode 中校验
+        exp = claims.get("exp")
+        if exp is not None and now > exp + self.leeway:
+            raise ExpiredTokenError("Token has expired")
+        nbf = claims.get("nbf")
+        if nbf is not None and now < nbf - self.leeway:
+            raise ExpiredTokenError("Token is not yet valid")
+
+    # ------------------------------------------------------------------
+    # LRU
+    # ------------------------------------------------------------------
+    def _cached(self, key: bytes, now: float) -> Optional[list]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            self._cache.move_to_end(key)
+        try:
+            self._check_time(entry[0], now)
+        except ExpiredTokenError:
+            self._evict(key)
+            raise
+        return entry
+
+    def _store(self, key: bytes, entry: list) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _evict(self, key: bytes) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+
+_token_verifier: Optional[TokenVerifier] = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    """Get the shared TokenVerifier configured from ``settings.security``."""
+    global _token_verifier
+    if _token_verifier is None:
+        revocation = RedisRevocationSet() if settings.security.jwt_revocation_enabled else None
+        _token_verifier = TokenVerifier(revocation=revocation)
+    return _token_verifier
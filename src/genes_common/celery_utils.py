@@ -0,0 +1,87 @@
+"""Celery helpers.
+
+Provides the size-threshold compression codec used by
+``Settings.get_celery_config`` and a small helper to apply the shared
+profile to a Celery app.
+
+Example:
+    from celery import Celery
+    from genes_common.celery_utils import configure_celery
+
+    app = configure_celery(Celery("genes"))
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional
+
+# 尝试导入 kombu（随 Celery 一起安装），如果没有安装则设为 None
+try:
+    from kombu import compression as kombu_compression
+    KOMBU_AVAILABLE = True
+except ImportError:
+    kombu_compression = None
+    KOMBU_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "KOMBU_AVAILABLE",
+    "threshold_compression_name",
+    "register_threshold_compression",
+    "configure_celery",
+]
+
+# 消息体首字节标记：是否经过压缩
+_RAW_MARKER = b"\x00"
+_COMPRESSED_MARKER = b"\x01"
+
+
+def threshold_compression_name(method: str) -> str:
+    """Name under which the threshold codec for ``method`` is registered."""
+    return f"genes-threshold+{method}"
+
+
+def register_threshold_compression(method: str = "zlib", threshold: int = 16384) -> str:
+    """Register a kombu codec that only compresses bodies of ``threshold`` bytes or more.
+
+    Small task messages skip compression entirely (one marker byte is
+    prepended), large payloads are compressed with the kombu codec named
+    ``method``. The decoder only looks at the marker byte, so producers and
+    workers may use different thresholds. Returns the codec name to use as
+    ``task_compression``/``result_compression``.
+    """
+    if not KOMBU_AVAILABLE:
+        raise ImportError("Kombu is not installed. Install with: pip install celery")
+
+    try:
+        encoder, inner_content_type = kombu_compression.get_encoder(method)
+    except KeyError:
+        raise ValueError(f"Unknown Celery compression method: {method} (e.g. zlib, bzip2, gzip, lzma, zstd)") from None
+    decoder = kombu_compression.get_decoder(inner_content_type)
+    name = threshold_compression_name(method)
+
+    def encode(body: bytes) -> bytes:
+        if len(body) < threshold:
+            return _RAW_MARKER + body
+        return _COMPRESSED_MARKER + encoder(body)
+
+    def decode(body: bytes) -> bytes:
+        marker, payload = body[:1], body[1:]
+        if marker == _COMPRESSED_MARKER:
+            return decoder(payload)
+        return payload
+
+    kombu_compression.register(
+        encode, decode, f"application/x-{name}", aliases=[name]
+    )
+    logger.debug("Registered Celery compression %s (threshold=%d bytes)", name, threshold)
+    return name
+
+
+def configure_celery(app: Any, settings: Optional[Any] = None) -> Any:
+    """Apply the shared Celery profile from ``settings`` to ``app``."""
+    if settings is None:
+        from .config import settings
+    app.conf.update(settings.get_celery_config())
+    return app
@@ -1,5 +1,6 @@
+import importlib.util
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import timedelta
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
@@ -10,6 +11,132 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+_MONGODB_READ_PREFERENCES = ("primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest")
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else None
+
+
+def _env_list(name: str, default: str = "") -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+def _parse_tag_sets(value: str) -> List[Dict[str, str]]:
+    """解析 "dc:east,use:analytics;dc:west" 格式的 read preference tag sets"""
+    tag_sets = []
+    for tag_set in value.split(";"):
+        tags = {}
+        for item in tag_set.split(","):
+            key, sep, tag_value = item.partition(":")
+            if sep:
+                tags[key.strip()] = tag_value.strip()
+        tag_sets.append(tags)
+    return tag_sets if value.strip() else []
+
+
+@dataclass
+class MongoClientProfile:
+    """MongoDB 客户端配置档（压缩、读偏好、读写关注、连接池与超时）"""
+    compressors: List[str] = field(default_factory=list)
+    zlib_compression_level: Optional[int] = None
+    read_preference: Optional[str] = None
+    read_preference_tags: List[Dict[str, str]] = field(default_factory=list)
+    read_concern: Optional[str] = None
+    write_concern_w: Optional[str] = None
+    write_concern_journal: Optional[bool] = None
+    write_concern_timeout_ms: Optional[int] = None
+    max_pool_size: Optional[int] = None
+    min_pool_size: Optional[int] = None
+    max_idle_time_ms: Optional[int] = None
+    server_selection_timeout_ms: Optional[int] = None
+    connect_timeout_ms: Optional[int] = None
+    socket_timeout_ms: Optional[int] = None
+    # 客户端级操作超时（服务端按 maxTimeMS 执行）
+    timeout_ms: Optional[int] = None
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults: Any) -> "MongoClientProfile":
+        """Build a profile from ``<prefix>_*`` environment variables over ``defaults``."""
+        profile = cls(**defaults)
+        if os.getenv(f"{prefix}_COMPRESSORS") is not None:
+            profile.compressors = _env_list(f"{prefix}_COMPRESSORS")
+        if os.getenv(f"{prefix}_READ_PREFERENCE_TAGS") is not None:
+            profile.read_preference_tags = _parse_tag_sets(os.getenv(f"{prefix}_READ_PREFERENCE_TAGS"))
+        profile.read_preference = os.getenv(f"{prefix}_READ_PREFERENCE", profile.read_preference)
+        profile.read_concern = os.getenv(f"{prefix}_READ_CONCERN", profile.read_concern)
+        profile.write_concern_w = os.getenv(f"{prefix}_WRITE_CONCERN_W", profile.write_concern_w)
+        if os.getenv(f"{prefix}_WRITE_CONCERN_JOURNAL") is not None:
+            profile.write_concern_journal = os.getenv(f"{prefix}_WRITE_CONCERN_JOURNAL").lower() == "true"
+        for name in (
+            "zlib_compression_level",
+            "write_concern_timeout_ms",
+            "max_pool_size",
+            "min_pool_size",
+            "max_idle_time_ms",
+            "server_selection_timeout_ms",
+            "connect_timeout_ms",
+            "socket_timeout_ms",
+            "timeout_ms",
+        ):
+            value = _env_int(f"{prefix}_{name.upper()}")
+            if value is not None:
+                setattr(profile, name, value)
+        return profile
+
+    def to_client_kwargs(self) -> Dict[str, Any]:
+        """Get MongoClient keyword arguments; unset options keep URI/driver defaults."""
+        w = self.write_concern_w
+        # pymongo 以 "k:v,k:v" 字符串列表接收 tag sets，空字符串表示任意节点
+        tag_sets = [",".join(f"{key}:{value}" for key, value in tags.items()) for tags in self.read_preference_tags]
+        options = {
+            "compressors": ",".join(self.compressors) or None,
+            "zlibCompressionLevel": self.zlib_compression_level,
+            "readPreference": self.read_preference,
+            "readPreferenceTags": tag_sets or None,
+            "readConcernLevel": self.read_concern,
+            "w": int(w) if w is not None and w.isdigit() else w,
+            "journal": self.write_concern_journal,
+            "wTimeoutMS": self.write_concern_timeout_ms,
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "timeoutMS": self.timeout_ms,
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+
+def _default_mongodb_profiles() -> Dict[str, MongoClientProfile]:
+    """默认档 default（OLTP）与 analytics（批量分析），以及 MONGODB_PROFILES 中声明的额外档"""
+    # 未安装 zstandard 时 pymongo 会对 zstd 告警并退回 zlib，因此只在可用时列出
+    analytics_compressors = ["zlib"]
+    if importlib.util.find_spec("zstandard") is not None:
+        analytics_compressors.insert(0, "zstd")
+    profiles = {
+        "default": MongoClientProfile.from_env("MONGODB"),
+        "analytics": MongoClientProfile.from_env(
+            "MONGODB_ANALYTICS",
+            compressors=analytics_compressors,
+            read_preference="secondaryPreferred",
+            read_concern="local",
+            max_pool_size=20,
+            server_selection_timeout_ms=10000,
+        ),
+    }
+    for name in _env_list("MONGODB_PROFILES"):
+        profiles.setdefault(name.lower(), MongoClientProfile.from_env(f"MONGODB_{name.upper()}"))
+    return profiles
+
+
 @dataclass
 class DatabaseConfig:
     """数据库配置"""
@@ -19,7 +146,9 @@ class DatabaseConfig:
     mysql_user: str = field(default_factory=lambda: os.getenv("MYSQL_USER", "gene_user"))
     mysql_password: str = field(default_factory=lambda: os.getenv("MYSQL_PASSWORD", "gene_password"))
     mysql_database: str = field(default_factory=lambda: os.getenv("MYSQL_DATABASE", "gene_db"))
-    
+    mysql_query_cache_ttl: int = field(default_factory=lambda: int(os.getenv("MYSQL_QUERY_CACHE_TTL", "300")))
+    mysql_query_cache_prefix: str = field(default_factory=lambda: os.getenv("MYSQL_QUERY_CACHE_PREFIX", "genes:qcache"))
+
     # MongoDB settings
     mongodb_host: str = field(default_factory=lambda: os.getenv("MONGODB_HOST", "mongodb"))
     mongodb_port: int = field(default_factory=lambda: int(os.getenv("MONGODB_PORT", "27017")))
@@ -27,11 +156,38 @@ class DatabaseConfig:
     mongodb_password: str = field(default_factory=lambda: os.getenv("MONGODB_PASSWORD", "gene_password"))
     mongodb_database: str = field(default_factory=lambda: os.getenv("MONGODB_DATABASE", "gene_db"))
     mongodb_test_host: str = field(default_factory=lambda: os.getenv("MONGODB_TEST_HOST", "mongodb_test"))
+    mongodb_profiles: Dict[str, MongoClientProfile] = field(default_factory=_default_mongodb_profiles)
     
     # Redis settings
     redis_host: str = field(default_factory=lambda: os.getenv("REDIS_HOST", "redis"))
     redis_port: int = field(default_factory=lambda: int(os.getenv("REDIS_PORT", "6379")))
-    
+    redis_db: int = field(default_factory=lambda: int(os.getenv("REDIS_DB", "0")))
+    redis_password: str = field(default_factory=lambda: os.getenv("REDIS_PASSWORD", ""))
+    # standalone / sentinel / cluster
+    redis_mode: str = field(default_factory=lambda: os.getenv("REDIS_MODE", "standalone").lower())
+    redis_sentinels: str = field(default_factory=lambda: os.getenv("REDIS_SENTINELS", ""))
+    redis_sentinel_master: str = field(default_factory=lambda: os.getenv("REDIS_SENTINEL_MASTER", "mymaster"))
+    redis_sentinel_password: str = field(default_factory=lambda: os.getenv("REDIS_SENTINEL_PASSWORD", ""))
+    redis_cluster_nodes: str = field(default_factory=lambda: os.getenv("REDIS_CLUSTER_NODES", ""))
+    redis_read_from_replicas: bool = field(default_factory=lambda: os.getenv("REDIS_READ_FROM_REPLICAS", "False").lower() == "true")
+
+    # Redis connection pool settings
+    redis_max_connections: int = field(default_factory=lambda: int(os.getenv("REDIS_MAX_CONNECTIONS", "50")))
+    # 默认不设超时，避免 pubsub.listen()/BLPOP 等阻塞命令超时
+    redis_socket_timeout: Optional[float] = field(default_factory=lambda: _env_float("REDIS_SOCKET_TIMEOUT"))
+    redis_pool_timeout: float = field(default_factory=lambda: float(os.getenv("REDIS_POOL_TIMEOUT", "20")))
+    redis_socket_keepalive: bool = field(default_factory=lambda: os.getenv("REDIS_SOCKET_KEEPALIVE", "True").lower() == "true")
+    redis_health_check_interval: int = field(default_factory=lambda: int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")))
+
+    # Startup warm-up / readiness settings
+    db_warmup_connections: int = field(default_factory=lambda: int(os.getenv("DB_WARMUP_CONNECTIONS", "4")))
+    db_warmup_timeout: float = field(default_factory=lambda: float(os.getenv("DB_WARMUP_TIMEOUT", "30")))
+    db_health_cache_ttl: float = field(default_factory=lambda: float(os.getenv("DB_HEALTH_CACHE_TTL", "5")))
+    db_health_timeout: float = field(default_factory=lambda: float(os.getenv("DB_HEALTH_TIMEOUT", "2")))
+
+    # Shared reference data (memory-mapped lookup tables)
+    refdata_dir: str = field(default_factory=lambda: os.getenv("REFDATA_DIR", "/var/tmp/genes-refdata"))
+
     @property
     def sqlalchemy_database_uri(self) -> str:
         """Get the SQLAlchemy database URI."""
@@ -45,6 +201,37 @@ class DatabaseConfig:
             f"mongodb://{self.mongodb_user}:{self.mongodb_password}@{self.mongodb_host}:{self.mongodb_port}/?authSource=admin",
         )
 
+    def get_mongodb_profile(self, name: str = "default") -> MongoClientProfile:
+        """Get a named MongoDB client profile."""
+        try:
+            return self.mongodb_profiles[name]
+        except KeyError:
+            raise ValueError(
+                f"Unknown MongoDB profile '{name}' (available: {', '.join(sorted(self.mongodb_profiles))})"
+            ) from None
+
+    @property
+    def redis_sentinel_addresses(self) -> List[Tuple[str, int]]:
+        """Get the Redis Sentinel addresses as (host, port) pairs."""
+        return _parse_host_ports(self.redis_sentinels, 26379)
+
+    @property
+    def redis_cluster_addresses(self) -> List[Tuple[str, int]]:
+        """Get the Redis Cluster startup nodes, falling back to redis_host:redis_port."""
+        return _parse_host_ports(self.redis_cluster_nodes, self.redis_port) or [(self.redis_host, self.redis_port)]
+
+
+def _parse_host_ports(value: str, default_port: int) -> List[Tuple[str, int]]:
+    """解析 "host:port,host:port" 格式的地址列表"""
+    addresses = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        addresses.append((host, int(port) if port else default_port))
+    return addresses
+
 
 @dataclass
 class AppConfig:
@@ -80,6 +267,11 @@ class SecurityConfig:
     jwt_access_token_expires: timedelta = field(default_factory=lambda: timedelta(days=1))
     jwt_access_token_expire_minutes: int = field(default_factory=lambda: int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30")))
     jwt_refresh_token_expires: timedelta = field(default_factory=lambda: timedelta(days=30))
+    jwt_leeway_seconds: int = field(default_factory=lambda: int(os.getenv("JWT_LEEWAY_SECONDS", "0")))
+    jwt_verify_cache_size: int = field(default_factory=lambda: int(os.getenv("JWT_VERIFY_CACHE_SIZE", "10000")))
+    jwt_require_exp: bool = field(default_factory=lambda: os.getenv("JWT_REQUIRE_EXP", "False").lower() == "true")
+    jwt_revocation_enabled: bool = field(default_factory=lambda: os.getenv("JWT_REVOCATION_ENABLED", "False").lower() == "true")
+    jwt_revocation_check_interval: float = field(default_factory=lambda: float(os.getenv("JWT_REVOCATION_CHECK_INTERVAL", "30")))
     
     # Admin user settings (for dashboard)
     admin_username: str = field(default_factory=lambda: os.getenv("ADMIN_USERNAME", "admin"))
@@ -98,6 +290,22 @@ class ExternalServiceConfig:
     celery_broker_url: str = field(default_factory=lambda: os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0"))
     celery_result_backend: str = field(default_factory=lambda: os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/0"))
 
+    # Celery serialization / compression
+    celery_task_serializer: str = field(default_factory=lambda: os.getenv("CELERY_TASK_SERIALIZER", "json"))
+    celery_result_serializer: str = field(default_factory=lambda: os.getenv("CELERY_RESULT_SERIALIZER", "json"))
+    celery_accept_content: List[str] = field(default_factory=lambda: [
+        item.strip() for item in os.getenv("CELERY_ACCEPT_CONTENT", "json").split(",") if item.strip()
+    ])
+    celery_compression: str = field(default_factory=lambda: os.getenv("CELERY_COMPRESSION", "none"))
+    celery_compression_threshold: int = field(default_factory=lambda: int(os.getenv("CELERY_COMPRESSION_THRESHOLD", "16384")))
+
+    # Celery worker / broker tuning
+    celery_prefetch_multiplier: int = field(default_factory=lambda: int(os.getenv("CELERY_PREFETCH_MULTIPLIER", "4")))
+    celery_acks_late: bool = field(default_factory=lambda: os.getenv("CELERY_ACKS_LATE", "False").lower() == "true")
+    celery_result_expires: int = field(default_factory=lambda: int(os.getenv("CELERY_RESULT_EXPIRES", "3600")))
+    celery_broker_pool_limit: int = field(default_factory=lambda: int(os.getenv("CELERY_BROKER_POOL_LIMIT", "10")))
+    celery_redis_max_connections: int = field(default_factory=lambda: int(os.getenv("CELERY_REDIS_MAX_CONNECTIONS", "20")))
+
 
 @dataclass
 class LoggingConfig:
@@ -138,6 +346,15 @@ class DatabaseConfigValidator(ConfigValidator):
             raise ValueError("MongoDB host and user must be provided")
         if config.mysql_port <= 0 or config.mongodb_port <= 0:
             raise ValueError("Database ports must be positive integers")
+        if config.redis_mode not in ("standalone", "sentinel", "cluster"):
+            raise ValueError("Redis mode must be one of: standalone, sentinel, cluster")
+        if config.redis_mode == "sentinel" and not config.redis_sentinel_addresses:
+            raise ValueError("Redis sentinels must be provided in sentinel mode")
+        for name, profile in config.mongodb_profiles.items():
+            if profile.read_preference is not None and profile.read_preference not in _MONGODB_READ_PREFERENCES:
+                raise ValueError(f"MongoDB profile '{name}' has invalid read preference: {profile.read_preference}")
+            if profile.read_preference in (None, "primary") and profile.read_preference_tags:
+                raise ValueError(f"MongoDB profile '{name}' cannot use read preference tags with primary reads")
         return True
 
 
@@ -209,15 +426,41 @@ class Settings:
     
     def get_celery_config(self) -> Dict[str, Any]:
         """获取Celery配置字典"""
+        external = self.external
+        compression = self._get_celery_compression()
         return {
-            "broker_url": self.external.celery_broker_url,
-            "result_backend": self.external.celery_result_backend,
-            "task_serializer": "json",
-            "accept_content": ["json"],
-            "result_serializer": "json",
+            "broker_url": external.celery_broker_url,
+            "result_backend": external.celery_result_backend,
+            "task_serializer": external.celery_task_serializer,
+            "accept_content": external.celery_accept_content,
+            "result_accept_content": external.celery_accept_content,
+            "result_serializer": external.celery_result_serializer,
+            "task_compression": compression,
+            "result_compression": compression,
+            "worker_prefetch_multiplier": external.celery_prefetch_multiplier,
+            "task_acks_late": external.celery_acks_late,
+            "task_reject_on_worker_lost": external.celery_acks_late,
+            "result_expires": external.celery_result_expires,
+            "broker_pool_limit": external.celery_broker_pool_limit,
+            "broker_transport_options": {"max_connections": external.celery_redis_max_connections},
+            "redis_max_connections": external.celery_redis_max_connections,
             "timezone": "UTC",
             "enable_utc": True,
         }
+
+    def _get_celery_compression(self) -> Optional[str]:
+        """获取Celery压缩方式；设置了阈值时使用按大小压缩的编码"""
+        method = self.external.celery_compression
+        if not method or method.lower() == "none":
+            return None
+        if self.external.celery_compression_threshold <= 0:
+            return method
+
+        from .celery_utils import KOMBU_AVAILABLE, register_threshold_compression
+        if not KOMBU_AVAILABLE:
+            # 未安装Celery时配置不会被使用，直接返回原始压缩方式
+            return method
+        return register_threshold_compression(method, self.external.celery_compression_threshold)
     
     # 向后兼容的属性访问
     @property
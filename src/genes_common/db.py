@@ -1,6 +1,13 @@
+import inspect
 import logging
-from typing import Optional, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional, Any, Callable, Dict, List, Sequence
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from pymongo import MongoClient
+from pymongo.collection import Collection
 from pymongo.database import Database
 from .config import settings
 
@@ -31,54 +38,174 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 # Global connection instances
-_mongo_client: Optional[MongoClient] = None
+_mongo_clients: Dict[str, MongoClient] = {}
 _redis_client = None
+_redis_replica_client = None
 _mysql_engine = None
 _mysql_session_factory = None
 
+# 懒加载客户端的创建锁（双重检查），避免并发首次调用创建重复客户端
+_mongo_lock = threading.Lock()
+_redis_lock = threading.Lock()
+_mysql_lock = threading.RLock()
 
-def get_mongo_client() -> MongoClient:
-    """Get MongoDB client instance."""
-    global _mongo_client
-    if _mongo_client is None:
-        try:
-            logger.info(f"Connecting to MongoDB: {settings.MONGODB_URI}")
-            _mongo_client = MongoClient(settings.MONGODB_URI)
-            # Test connection
-            _mongo_client.admin.command('ping')
-            logger.info("Connected to MongoDB successfully")
-        except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            raise
-    return _mongo_client
+# Cached readiness results (checked_at is time.monotonic())
+_health_lock = threading.Lock()
+_health_cache: Dict[tuple, Dict[str, Any]] = {}
+_health_checked_at: Dict[tuple, float] = {}
 
 
-def get_mongo_db() -> Database:
+def get_mongo_client(profile: str = "default") -> MongoClient:
+    """Get MongoDB client instance for a named client profile.
+
+    Each profile in ``DatabaseConfig.mongodb_profiles`` (e.g. "default" for
+    OLTP, "analytics" for bulk scans) gets its own client and pool, so they
+    can be used side by side.
+    """
+    client = _mongo_clients.get(profile)
+    if client is not None:
+        return client
+    with _mongo_lock:
+        client = _mongo_clients.get(profile)
+        if client is None:
+            options = settings.database.get_mongodb_profile(profile).to_client_kwargs()
+            try:
+                logger.info(f"Connecting to MongoDB ({profile}): {settings.MONGODB_URI}")
+                client = MongoClient(settings.MONGODB_URI, **options)
+                # Test connection
+                client.admin.command('ping')
+                logger.info(f"Connected to MongoDB ({profile}) successfully")
+            except Exception as e:
+                logger.error(f"Failed to connect to MongoDB ({profile}): {e}")
+                if client is not None:
+                    client.close()
+                raise
+            _mongo_clients[profile] = client
+    return client
+
+
+def get_mongo_db(profile: str = "default") -> Database:
     """Get MongoDB database instance."""
-    client = get_mongo_client()
+    client = get_mongo_client(profile)
     return client[settings.database.mongodb_database]
 
 
-def get_redis_client():
-    """Get Redis client instance (if available)."""
+# 原始 BSON 读取模式：文档保持为未解码的 BSON 字节，按需解码字段
+RAW_BSON_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def get_mongo_raw_db(profile: str = "default") -> Database:
+    """Get MongoDB database instance returning RawBSONDocument results.
+
+    Documents are not decoded into dicts; fields are decoded lazily on access
+    and ``doc.raw`` exposes the BSON bytes (see ``genes_common.mongo_json``).
+    Use it for reads only.
+    """
+    client = get_mongo_client(profile)
+    return client.get_database(settings.database.mongodb_database, codec_options=RAW_BSON_CODEC_OPTIONS)
+
+
+def get_mongo_raw_collection(name: str, profile: str = "default") -> Collection:
+    """Get a MongoDB collection returning RawBSONDocument results."""
+    return get_mongo_raw_db(profile)[name]
+
+
+def _redis_connection_kwargs() -> dict:
+    """Connection/pool keyword arguments shared by all Redis modes."""
+    config = settings.database
+    return {
+        "password": config.redis_password or None,
+        "max_connections": config.redis_max_connections,
+        "socket_timeout": config.redis_socket_timeout,
+        "socket_keepalive": config.redis_socket_keepalive,
+        "health_check_interval": config.redis_health_check_interval,
+        "decode_responses": True,
+    }
+
+
+def _create_redis_client(readonly: bool = False):
+    """Create a Redis client for the configured mode."""
+    config = settings.database
+    kwargs = _redis_connection_kwargs()
+
+    if config.redis_mode == "sentinel":
+        from redis.sentinel import Sentinel
+
+        # Sentinel 节点的密码与数据节点分开配置，未设置时不向 Sentinel 发送 AUTH
+        sentinel_kwargs = None
+        if config.redis_sentinel_password:
+            sentinel_kwargs = {
+                "password": config.redis_sentinel_password,
+                "socket_timeout": config.redis_socket_timeout,
+            }
+        sentinel = Sentinel(
+            config.redis_sentinel_addresses,
+            socket_timeout=config.redis_socket_timeout,
+            sentinel_kwargs=sentinel_kwargs,
+        )
+        if readonly:
+            return sentinel.slave_for(config.redis_sentinel_master, db=config.redis_db, **kwargs)
+        return sentinel.master_for(config.redis_sentinel_master, db=config.redis_db, **kwargs)
+
+    if config.redis_mode == "cluster":
+        from redis.cluster import RedisCluster, ClusterNode
+
+        return RedisCluster(
+            startup_nodes=[ClusterNode(host, port) for host, port in config.redis_cluster_addresses],
+            read_from_replicas=readonly,
+            **kwargs,
+        )
+
+    # 连接池用尽时等待空闲连接（最多 redis_pool_timeout 秒），而不是立即报错
+    pool = redis.BlockingConnectionPool(
+        host=config.redis_host,
+        port=config.redis_port,
+        db=config.redis_db,
+        timeout=config.redis_pool_timeout,
+        **kwargs,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def get_redis_client(readonly: bool = False):
+    """Get Redis client instance (if available).
+
+    The connection mode (standalone/sentinel/cluster) is selected by
+    ``DatabaseConfig.redis_mode``. With ``readonly=True`` and
+    ``REDIS_READ_FROM_REPLICAS`` enabled, a client that reads from replicas
+    is returned; otherwise the primary client is used.
+    """
     if not REDIS_AVAILABLE:
         raise ImportError("Redis is not installed. Install with: pip install redis")
-    
-    global _redis_client
+
+    global _redis_client, _redis_replica_client
+    if readonly and settings.database.redis_read_from_replicas and settings.database.redis_mode != "standalone":
+        if _redis_replica_client is None:
+            with _redis_lock:
+                if _redis_replica_client is None:
+                    try:
+                        client = _create_redis_client(readonly=True)
+                        # Test connection
+                        client.ping()
+                        logger.info(f"Connected to Redis replicas ({settings.database.redis_mode}) successfully")
+                    except Exception as e:
+                        logger.error(f"Failed to connect to Redis replicas: {e}")
+                        raise
+                    _redis_replica_client = client
+        return _redis_replica_client
+
     if _redis_client is None:
-        try:
-            _redis_client = redis.Redis(
-                host=settings.database.redis_host,
-                port=settings.database.redis_port,
-                db=0,  # Default to DB 0
-                decode_responses=True
-            )
-            # Test connection
-            _redis_client.ping()
-            logger.info("Connected to Redis successfully")
-        except Exception as e:
-            logger.error(f"Failed to connect to Redis: {e}")
-            raise
+        with _redis_lock:
+            if _redis_client is None:
+                try:
+                    client = _create_redis_client()
+                    # Test connection
+                    client.ping()
+                    logger.info(f"Connected to Redis ({settings.database.redis_mode}) successfully")
+                except Exception as e:
+                    logger.error(f"Failed to connect to Redis: {e}")
+                    raise
+                _redis_client = client
     return _redis_client
 
 
@@ -88,29 +215,36 @@ def get_mysql_engine():
         raise ImportError("MySQL dependencies are not installed. Install with: pip install pymysql sqlalchemy")
     
     global _mysql_engine
-    if _mysql_engine is None:
-        try:
-            database_uri = settings.SQLALCHEMY_DATABASE_URI
-            logger.info(f"Connecting to MySQL: {database_uri.replace(settings.database.mysql_password, '***')}")
-            
-            _mysql_engine = create_engine(
-                database_uri,
-                poolclass=QueuePool,
-                pool_size=10,
-                max_overflow=20,
-                pool_pre_ping=True,
-                pool_recycle=3600,
-                echo=False  # Set to True for SQL query logging
-            )
-            
-            # Test connection
-            with _mysql_engine.connect() as connection:
-                connection.execute(sqlalchemy.text("SELECT 1"))
-            
-            logger.info("Connected to MySQL successfully")
-        except Exception as e:
-            logger.error(f"Failed to connect to MySQL: {e}")
-            raise
+    if _mysql_engine is not None:
+        return _mysql_engine
+    with _mysql_lock:
+        if _mysql_engine is None:
+            engine = None
+            try:
+                database_uri = settings.SQLALCHEMY_DATABASE_URI
+                logger.info(f"Connecting to MySQL: {database_uri.replace(settings.database.mysql_password, '***')}")
+
+                engine = create_engine(
+                    database_uri,
+                    poolclass=QueuePool,
+                    pool_size=10,
+                    max_overflow=20,
+                    pool_pre_ping=True,
+                    pool_recycle=3600,
+                    echo=False  # Set to True for SQL query logging
+                )
+
+                # Test connection
+                with engine.connect() as connection:
+                    connection.execute(sqlalchemy.text("SELECT 1"))
+
+                logger.info("Connected to MySQL successfully")
+            except Exception as e:
+                logger.error(f"Failed to connect to MySQL: {e}")
+                if engine is not None:
+                    engine.dispose()
+                raise
+            _mysql_engine = engine
     return _mysql_engine
 
 
@@ -121,8 +255,9 @@ def get_mysql_session():
     
     global _mysql_session_factory
     if _mysql_session_factory is None:
-        engine = get_mysql_engine()
-        _mysql_session_factory = sessionmaker(bind=engine)
+        with _mysql_lock:
+            if _mysql_session_factory is None:
+                _mysql_session_factory = sessionmaker(bind=get_mysql_engine())
     
     return _mysql_session_factory()
 
@@ -136,22 +271,258 @@ def get_mysql_connection():
     return engine.connect()
 
 
+def _available_backends() -> List[str]:
+    """Backends whose client libraries are installed."""
+    backends = ["mongodb"]
+    if REDIS_AVAILABLE:
+        backends.append("redis")
+    if MYSQL_AVAILABLE:
+        backends.append("mysql")
+    return backends
+
+
+def _run_concurrently(tasks: Dict[str, Callable[[], Any]], timeout: float) -> Dict[str, Optional[BaseException]]:
+    """Run named tasks in parallel; map each name to its error (None on success)."""
+    if not tasks:
+        return {}
+    executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="genes-db")
+    try:
+        futures = {name: executor.submit(task) for name, task in tasks.items()}
+        wait(futures.values(), timeout=timeout)
+        errors: Dict[str, Optional[BaseException]] = {}
+        for name, future in futures.items():
+            if not future.done():
+                errors[name] = TimeoutError(f"{name} did not respond within {timeout}s")
+            else:
+                errors[name] = future.exception()
+        return errors
+    finally:
+        # 不等待超时的任务，避免阻塞调用方
+        executor.shutdown(wait=False)
+
+
+def _mongo_profiles(profiles: Optional[Sequence[str]]) -> List[str]:
+    """Requested MongoDB profiles.
+
+    Defaults to "default" plus the profiles this process has already
+    connected, so unused profiles such as "analytics" are never created just
+    for warm-up or readiness checks.
+    """
+    if profiles is None:
+        return ["default"] + [profile for profile in list(_mongo_clients) if profile != "default"]
+    for profile in profiles:
+        settings.database.get_mongodb_profile(profile)
+    return list(profiles)
+
+
+def _for_each_mongo_profile(profiles: Sequence[str], func: Callable[[str], None]) -> None:
+    """Run ``func`` for every profile concurrently, raising one error naming all failed profiles."""
+    with ThreadPoolExecutor(max_workers=max(len(profiles), 1)) as executor:
+        futures = {profile: executor.submit(func, profile) for profile in profiles}
+    errors = {profile: future.exception() for profile, future in futures.items() if future.exception() is not None}
+    if errors:
+        raise ConnectionError("; ".join(f"{profile}: {error}" for profile, error in errors.items()))
+
+
+def _warmup_mongo(connections: int, profiles: Optional[Sequence[str]] = None) -> None:
+    def warm(profile: str) -> None:
+        client = get_mongo_client(profile)
+        # 并发 ping 促使连接池建立多个连接
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(lambda _: client.admin.command("ping"), range(connections)))
+
+    _for_each_mongo_profile(_mongo_profiles(profiles), warm)
+
+
+def _get_pool_connection(pool: Any) -> Any:
+    # redis-py 5.3 起 get_connection() 的命令名参数已废弃
+    try:
+        parameters = inspect.signature(pool.get_connection).parameters
+    except (TypeError, ValueError):
+        parameters = {}
+    required = [
+        parameter for parameter in parameters.values()
+        if parameter.default is inspect.Parameter.empty
+        and parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+    ]
+    return pool.get_connection("PING") if required else pool.get_connection()
+
+
+def _warmup_redis(connections: int) -> None:
+    client = get_redis_client()
+    pool = getattr(client, "connection_pool", None)
+    if pool is None:
+        # RedisCluster keeps one pool per node; the initial ping is enough
+        return
+    held = []
+    try:
+        for _ in range(min(connections, settings.database.redis_max_connections)):
+            held.append(_get_pool_connection(pool))
+    finally:
+        for connection in held:
+            pool.release(connection)
+
+
+def _warmup_mysql(connections: int) -> None:
+    engine = get_mysql_engine()
+    held = []
+    try:
+        for _ in range(min(connections, engine.pool.size())):
+            connection = engine.connect()
+            held.append(connection)
+            connection.execute(sqlalchemy.text("SELECT 1"))
+    finally:
+        for connection in held:
+            connection.close()
+
+
+_WARMUP_FUNCS: Dict[str, Callable[[int], None]] = {
+    "mongodb": _warmup_mongo,
+    "redis": _warmup_redis,
+    "mysql": _warmup_mysql,
+}
+
+
+def warmup(
+    backends: Optional[Sequence[str]] = None,
+    connections: Optional[int] = None,
+    timeout: Optional[float] = None,
+    mongodb_profiles: Optional[Sequence[str]] = None,
+) -> Dict[str, bool]:
+    """Connect to all configured backends concurrently and pre-fill their pools.
+
+    Args:
+        backends: Backends to warm up ("mongodb", "redis", "mysql"); defaults to
+            every backend whose client library is installed.
+        connections: Pooled connections to open per backend
+            (default: ``DB_WARMUP_CONNECTIONS``).
+        timeout: Overall timeout in seconds (default: ``DB_WARMUP_TIMEOUT``).
+        mongodb_profiles: MongoDB client profiles to warm up; defaults to
+            "default" plus the profiles already connected in this process.
+
+    Returns:
+        Mapping of backend name to whether it warmed up successfully.
+    """
+    backends = list(backends) if backends is not None else _available_backends()
+    unknown = set(backends) - set(_WARMUP_FUNCS)
+    if unknown:
+        raise ValueError(f"Unknown backends: {', '.join(sorted(unknown))}")
+    connections = max(1, connections or settings.database.db_warmup_connections)
+    timeout = timeout if timeout is not None else settings.database.db_warmup_timeout
+    profiles = _mongo_profiles(mongodb_profiles)
+
+    tasks = {name: (lambda func=_WARMUP_FUNCS[name]: func(connections)) for name in backends}
+    if "mongodb" in tasks:
+        tasks["mongodb"] = lambda: _warmup_mongo(connections, profiles)
+
+    start = time.monotonic()
+    errors = _run_concurrently(tasks, timeout)
+    results = {}
+    for name, error in errors.items():
+        results[name] = error is None
+        if error is not None:
+            logger.error(f"Failed to warm up {name}: {error}")
+    logger.info(f"Backend warm-up finished in {time.monotonic() - start:.2f}s: {results}")
+    return results
+
+
+def _ping_mongo(profiles: Optional[Sequence[str]] = None) -> None:
+    _for_each_mongo_profile(
+        _mongo_profiles(profiles), lambda profile: get_mongo_client(profile).admin.command("ping")
+    )
+
+
+def _ping_redis() -> None:
+    get_redis_client().ping()
+
+
+def _ping_mysql() -> None:
+    with get_mysql_engine().connect() as connection:
+        connection.execute(sqlalchemy.text("SELECT 1"))
+
+
+_PING_FUNCS: Dict[str, Callable[[], None]] = {
+    "mongodb": _ping_mongo,
+    "redis": _ping_redis,
+    "mysql": _ping_mysql,
+}
+
+
+def check_readiness(
+    backends: Optional[Sequence[str]] = None,
+    ttl: Optional[float] = None,
+    mongodb_profiles: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Check that backends are reachable, caching the result for ``ttl`` seconds.
+
+    Intended for readiness/liveness probes: repeated calls within the TTL
+    (default: ``DB_HEALTH_CACHE_TTL``) return the cached result instead of
+    hitting the databases, and concurrent callers share a single check.
+    MongoDB is ready only when every profile in ``mongodb_profiles``
+    (default: "default" plus the profiles already connected) answers a ping.
+
+    Returns:
+        ``{"ready": bool, "checked_at": float, "backends": {name: {"ok": bool, "error": str | None}}}``
+    """
+    backends = tuple(backends) if backends is not None else tuple(_available_backends())
+    unknown = set(backends) - set(_PING_FUNCS)
+    if unknown:
+        raise ValueError(f"Unknown backends: {', '.join(sorted(unknown))}")
+    ttl = ttl if ttl is not None else settings.database.db_health_cache_ttl
+    profiles = tuple(_mongo_profiles(mongodb_profiles))
+    cache_key = (backends, profiles)
+
+    with _health_lock:
+        # TTL 用单调时钟判断，避免系统时间跳变导致缓存不过期或被跳过
+        now = time.monotonic()
+        cached = _health_cache.get(cache_key)
+        if cached is not None and now - _health_checked_at[cache_key] < ttl:
+            return cached
+
+        tasks = {name: _PING_FUNCS[name] for name in backends}
+        if "mongodb" in tasks:
+            tasks["mongodb"] = lambda: _ping_mongo(profiles)
+        errors = _run_concurrently(tasks, settings.database.db_health_timeout)
+        result = {
+            "ready": all(error is None for error in errors.values()),
+            "checked_at": time.time(),
+            "backends": {
+                name: {"ok": error is None, "error": None if error is None else str(error)}
+                for name, error in errors.items()
+            },
+        }
+        if not result["ready"]:
+            logger.warning(f"Readiness check failed: {result['backends']}")
+        _health_cache[cache_key] = result
+        _health_checked_at[cache_key] = now
+        return result
+
+
 def close_connections():
     """Close all database connections."""
-    global _mongo_client, _redis_client, _mysql_engine, _mysql_session_factory
+    global _redis_client, _redis_replica_client, _mysql_engine, _mysql_session_factory
     
-    if _mongo_client:
-        _mongo_client.close()
-        _mongo_client = None
-        logger.info("MongoDB connection closed")
+    for profile, client in list(_mongo_clients.items()):
+        client.close()
+        del _mongo_clients[profile]
+        logger.info(f"MongoDB connection ({profile}) closed")
     
     if _redis_client and REDIS_AVAILABLE:
         _redis_client.close()
         _redis_client = None
         logger.info("Redis connection closed")
+
+    if _redis_replica_client and REDIS_AVAILABLE:
+        _redis_replica_client.close()
+        _redis_replica_client = None
+        logger.info("Redis replica connection closed")
     
     if _mysql_engine and MYSQL_AVAILABLE:
         _mysql_engine.dispose()
         _mysql_engine = None
         _mysql_session_factory = None
         logger.info("MySQL connections closed")
+
+    with _health_lock:
+        _health_cache.clear()
+        _health_checked_at.clear()
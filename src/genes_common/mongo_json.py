@@ -0,0 +1,89 @@
+"""Stream MongoDB results to JSON bytes without building Python dicts.
+
+Pair with ``get_mongo_raw_db()``/``get_mongo_raw_collection()``: cursors then
+yield ``RawBSONDocument`` objects whose BSON bytes are converted straight to
+relaxed Extended JSON. With ``python-bsonjs`` installed the conversion runs in
+C (libbson); otherwise it falls back to ``bson.json_util``, which decodes each
+document to a dict first and costs as much as a regular cursor. Install the
+``raw`` extra (``pip install genes-common[raw]``) to get the fast path.
+
+Example:
+    from genes_common import get_mongo_raw_collection
+    from genes_common.mongo_json import stream_json_array
+
+    cursor = get_mongo_raw_collection("genes").find({"chrom": "chr17"})
+    return StreamingResponse(stream_json_array(cursor), media_type="application/json")
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Iterable, Iterator, Mapping
+
+import bson
+from bson import json_util
+from bson.raw_bson import RawBSONDocument
+
+# 尝试导入 bsonjs（C 实现的 BSON -> JSON），如果没有安装则设为 None
+try:
+    import bsonjs
+    BSONJS_AVAILABLE = True
+except ImportError:
+    bsonjs = None
+    BSONJS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["BSONJS_AVAILABLE", "to_json_bytes", "stream_json_array", "stream_json_lines"]
+
+
+_fallback_warned = False
+
+
+def to_json_bytes(document: Mapping[str, Any]) -> bytes:
+    """Encode one document as relaxed Extended JSON bytes."""
+    global _fallback_warned
+    raw = document.raw if isinstance(document, RawBSONDocument) else None
+    if BSONJS_AVAILABLE:
+        return bsonjs.dumps(raw if raw is not None else bson.encode(document)).encode("utf-8")
+    if not _fallback_warned:
+        _fallback_warned = True
+        logger.warning(
+            "python-bsonjs is not installed; raw BSON is decoded to dicts for JSON. "
+            "Install with: pip install genes-common[raw]"
+        )
+    if raw is not None:
+        document = bson.decode(raw)
+    return json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS).encode("utf-8")
+
+
+def _chunked(parts: Iterable[bytes], chunk_size: int) -> Iterator[bytes]:
+    """Join small byte strings into chunks of about ``chunk_size`` bytes."""
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def stream_json_array(documents: Iterable[Mapping[str, Any]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Yield a JSON array of ``documents`` in chunks suitable for a streaming response."""
+    def parts() -> Iterator[bytes]:
+        yield b"["
+        for i, document in enumerate(documents):
+            if i:
+                yield b","
+            yield to_json_bytes(document)
+        yield b"]"
+
+    return _chunked(parts(), chunk_size)
+
+
+def stream_json_lines(documents: Iterable[Mapping[str, Any]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Yield ``documents`` as newline-delimited JSON chunks."""
+    return _chunked((to_json_bytes(document) + b"\n" for document in documents), chunk_size)
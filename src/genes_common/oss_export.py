@@ -0,0 +1,477 @@
+"""Streaming export from MongoDB / MySQL to Aliyun OSS.
+
+Rows are read from a Mongo cursor or a MySQL server-side cursor and written
+into rolling, size-bounded, compressed parts (JSONL or Parquet). Each part is
+built in memory and uploaded concurrently while the next one is produced, so
+no local disk is needed. A manifest object next to the parts records every
+uploaded part, which lets an interrupted export resume where it stopped.
+
+Example:
+    from genes_common import OSSClient, get_mongo_db
+    from genes_common.oss_export import OSSStreamingExporter
+
+    exporter = OSSStreamingExporter(OSSClient(), "exports/genes/2024-06-01")
+    manifest = exporter.export_mongo(get_mongo_db().genes, {"species": "human"})
+"""
+from __future__ import annotations
+
+import base64
+import datetime
+import gzip
+import io
+import itertools
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import json_util
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+
+from .aliyun_oss import OSSClient
+
+# 尝试导入 zstandard，如果没有安装则设为 None
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# 尝试导入 pyarrow，如果没有安装则设为 None
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pyarrow = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["OSSStreamingExporter", "ZSTD_AVAILABLE", "PARQUET_AVAILABLE"]
+
+_JSONL_COMPRESSIONS = ("gzip", "zstd", "none")
+_PARQUET_COMPRESSIONS = ("zstd", "gzip", "snappy", "none")
+# 行组目标大小：小行组会放大元数据、降低压缩率并拖慢扫描
+_PARQUET_ROW_GROUP_ROWS = 1_000_000
+_PARQUET_ROW_GROUP_BYTES = 128 * 1024 * 1024
+_JSONL_EXTENSIONS = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst", "none": ".jsonl"}
+
+
+def _json_default(value: Any) -> Any:
+    """JSON fallback for BSON / SQL values."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, set):
+        return list(value)
+    return str(value)
+
+
+def _to_arrow_value(value: Any) -> Any:
+    """Convert BSON-specific values to types pyarrow understands."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    if isinstance(value, dict):
+        return {key: _to_arrow_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_arrow_value(item) for item in value]
+    return value
+
+
+class _JsonlPartWriter:
+    """In-memory JSON Lines part with optional gzip/zstd compression."""
+
+    def __init__(self, compression: str) -> None:
+        self.rows = 0
+        self._buffer = io.BytesIO()
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._buffer, mode="wb", compresslevel=6)
+        elif compression == "zstd":
+            self._stream = zstandard.ZstdCompressor(level=3).stream_writer(self._buffer, closefd=False)
+        else:
+            self._stream = self._buffer
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        lines = [
+            json.dumps(row, default=_json_default, ensure_ascii=False).encode("utf-8")
+            for row in rows
+        ]
+        lines.append(b"")
+        self._stream.write(b"\n".join(lines))
+        self.rows += len(rows)
+
+    def size(self) -> int:
+        return self._buffer.tell()
+
+    def finish(self) -> bytes:
+        if self._stream is not self._buffer:
+            self._stream.close()
+        return self._buffer.getvalue()
+
+
+class _SchemaChanged(Exception):
+    """A batch needs a wider schema than the open Parquet part was written with."""
+
+
+def _unify_schemas(current: Any, inferred: Any) -> Any:
+    """Merge two inferred schemas: null columns are promoted and new fields appended."""
+    try:
+        return pyarrow.unify_schemas([current, inferred], promote_options="permissive")
+    except TypeError:
+        # pyarrow < 14 没有 promote_options，默认规则同样允许 null 提升
+        return pyarrow.unify_schemas([current, inferred])
+
+
+class _ParquetPartWriter:
+    """In-memory Parquet part with large row groups.
+
+    Batches are buffered as Arrow tables and written as one row group once
+    ``_PARQUET_ROW_GROUP_ROWS`` rows or ``_PARQUET_ROW_GROUP_BYTES`` of Arrow
+    data are buffered, or when the part is finished. ``size()`` counts the
+    buffered Arrow data, so ``part_size`` bounds the uncompressed size of a
+    part and a part usually holds a single row group.
+
+    Without an explicit schema, each batch's inferred schema is merged into
+    the schema shared by all parts. When the merged schema is wider than the
+    one the open part was started with, ``write`` raises ``_SchemaChanged``
+    and the exporter rolls over to a new part.
+    """
+
+    def __init__(self, compression: str, schema_holder: Dict[str, Any], schema: Any = None) -> None:
+        self.rows = 0
+        self._compression = compression
+        self._schema_holder = schema_holder
+        self._explicit_schema = schema
+        self._sink = pyarrow.BufferOutputStream()
+        self._writer = None
+        self._schema = None
+        self._buffered: List[Any] = []
+        self._buffered_rows = 0
+        self._buffered_bytes = 0
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        rows = [_to_arrow_value(row) for row in rows]
+        try:
+            if self._explicit_schema is not None:
+                schema = self._explicit_schema
+            else:
+                # from_pylist 只按第一行的键推断列，这里取整批所有键
+                columns = list(dict.fromkeys(key for row in rows for key in row))
+                inferred = pyarrow.Table.from_pydict({key: [row.get(key) for row in rows] for key in columns}).schema
+                current = self._schema_holder.get("schema")
+                schema = inferred if current is None else _unify_schemas(current, inferred)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+            raise ValueError(f"Incompatible field types in export rows; pass schema= to the exporter: {e}") from e
+        if self._schema is not None and not schema.equals(self._schema):
+            raise _SchemaChanged()
+        self._schema_holder["schema"] = schema
+
+        try:
+            table = pyarrow.Table.from_pylist(rows, schema=schema)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+            raise ValueError(f"Rows do not match the Parquet export schema: {e}") from e
+        self._schema = schema
+        self._buffered.append(table)
+        self._buffered_rows += table.num_rows
+        self._buffered_bytes += table.nbytes
+        self.rows += len(rows)
+        if self._buffered_rows >= _PARQUET_ROW_GROUP_ROWS or self._buffered_bytes >= _PARQUET_ROW_GROUP_BYTES:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffered:
+            return
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._sink, self._schema, compression=self._compression)
+        table = pyarrow.concat_tables(self._buffered)
+        self._writer.write_table(table, row_group_size=table.num_rows)
+        self._buffered = []
+        self._buffered_rows = 0
+        self._buffered_bytes = 0
+
+    def size(self) -> int:
+        return self._sink.tell() + self._buffered_bytes
+
+    def finish(self) -> bytes:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+        return self._sink.getvalue().to_pybytes()
+
+
+class OSSStreamingExporter:
+    """Stream rows into compressed, size-bounded parts uploaded to OSS.
+
+    Parts are named ``<prefix>/part-00000<ext>`` and described by
+    ``<prefix>/_manifest.json``. At most ``max_concurrency`` parts are
+    uploading at any time; the producer blocks when that limit is reached,
+    which bounds memory to roughly ``(max_concurrency + 1) * part_size``.
+
+    Parquet parts infer their schema from the rows: columns that are null in
+    early batches are promoted and columns that appear later are added, which
+    starts a new part. Pass a ``pyarrow.Schema`` as ``schema`` to pin the
+    column types instead; rows that do not fit it raise ``ValueError``.
+    """
+
+    MANIFEST_NAME = "_manifest.json"
+
+    def __init__(
+        self,
+        oss_client: OSSClient,
+        prefix: str,
+        format: str = "jsonl",
+        compression: str = "gzip",
+        part_size: int = 64 * 1024 * 1024,
+        batch_size: int = 1000,
+        max_concurrency: int = 4,
+        schema: Any = None,
+    ) -> None:
+        if format == "jsonl":
+            if compression not in _JSONL_COMPRESSIONS:
+                raise ValueError(f"Unsupported JSONL compression: {compression}")
+            if compression == "zstd" and not ZSTD_AVAILABLE:
+                raise ImportError("zstandard is not installed. Install with: pip install zstandard")
+        elif format == "parquet":
+            if compression not in _PARQUET_COMPRESSIONS:
+                raise ValueError(f"Unsupported Parquet compression: {compression}")
+            if not PARQUET_AVAILABLE:
+                raise ImportError("pyarrow is not installed. Install with: pip install pyarrow")
+        else:
+            raise ValueError(f"Unsupported export format: {format}")
+        if schema is not None and format != "parquet":
+            raise ValueError("schema= is only supported for the parquet format")
+        if part_size <= 0 or batch_size <= 0 or max_concurrency <= 0:
+            raise ValueError("part_size, batch_size and max_concurrency must be positive")
+
+        self.oss = oss_client
+        self.prefix = prefix.rstrip("/")
+        self.format = format
+        self.compression = compression
+        self.part_size = part_size
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.schema = schema
+        self._manifest_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Sources
+    # ------------------------------------------------------------------
+    def export_mongo(
+        self,
+        collection: Any,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        resume: bool = True,
+    ) -> Dict[str, Any]:
+        """Export a Mongo collection in ``_id`` order; resumes after the last exported ``_id``."""
+        if projection and isinstance(projection, dict) and "_id" in projection and not projection["_id"]:
+            raise ValueError("export_mongo needs _id in the projection to record resume points")
+        manifest = self._load_manifest(resume)
+        if manifest["complete"]:
+            return manifest
+
+        query = dict(query or {})
+        last_key = manifest["parts"][-1]["last_key"] if manifest["parts"] else None
+        if last_key is not None:
+            query = {"$and": [query, {"_id": {"$gt": json_util.loads(last_key)}}]}
+        cursor = collection.find(query, projection, sort=[("_id", 1)], batch_size=self.batch_size)
+        try:
+            return self._run(cursor, manifest, key_field="_id")
+        finally:
+            cursor.close()
+
+    def export_mysql(
+        self,
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+        engine: Any = None,
+        resume: bool = True,
+        net_write_timeout: Optional[int] = 3600,
+    ) -> Dict[str, Any]:
+        """Export a MySQL query through a server-side cursor.
+
+        Resuming skips the rows already exported, so ``sql`` needs a
+        deterministic ``ORDER BY``.
+
+        The cursor is not read while the producer waits for a free upload
+        slot. If that wait exceeds ``net_write_timeout`` (MySQL default: 60s),
+        the server aborts the stream with "Lost connection". So this
+        connection's session timeout is raised to ``net_write_timeout``
+        seconds; pass None to keep the server setting.
+        """
+        from sqlalchemy import text
+        from .db import get_mysql_engine
+
+        manifest = self._load_manifest(resume)
+        if manifest["complete"]:
+            return manifest
+
+        engine = engine or get_mysql_engine()
+        with engine.connect() as connection:
+            if net_write_timeout is not None and engine.dialect.name == "mysql":
+                connection.execute(text(f"SET SESSION net_write_timeout = {int(net_write_timeout)}"))
+            result = connection.execution_options(
+                stream_results=True, max_row_buffer=self.batch_size
+            ).execute(text(sql), params or {})
+            rows = (dict(row._mapping) for row in result)
+            return self._run(itertools.islice(rows, manifest["rows"], None), manifest)
+
+    def export(self, rows: Iterable[Dict[str, Any]], resume: bool = True) -> Dict[str, Any]:
+        """Export an arbitrary row iterable; resuming skips the rows already exported."""
+        manifest = self._load_manifest(resume)
+        if manifest["complete"]:
+            return manifest
+        return self._run(itertools.islice(rows, manifest["rows"], None), manifest)
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+    @property
+    def manifest_key(self) -> str:
+        return f"{self.prefix}/{self.MANIFEST_NAME}"
+
+    def _part_key(self, index: int) -> str:
+        if self.format == "parquet":
+            extension = ".parquet"
+        else:
+            extension = _JSONL_EXTENSIONS[self.compression]
+        return f"{self.prefix}/part-{index:05d}{extension}"
+
+    def _new_manifest(self) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "format": self.format,
+            "compression": self.compression,
+            "parts": [],
+            "rows": 0,
+            "complete": False,
+        }
+
+    def _load_manifest(self, resume: bool) -> Dict[str, Any]:
+        """Load the manifest for resuming, keeping only the contiguous run of uploaded parts."""
+        if not resume or not self.oss.object_exists(self.manifest_key):
+            return self._new_manifest()
+
+        manifest = json.loads(self.oss.download_bytes(self.manifest_key))
+        if manifest.get("format") != self.format or manifest.get("compression") != self.compression:
+            raise ValueError(
+                f"Existing export at {self.prefix} uses {manifest.get('format')}/{manifest.get('compression')}"
+            )
+        if manifest.get("complete"):
+            logger.info("Export %s is already complete (%d rows)", self.prefix, manifest["rows"])
+            return manifest
+
+        # 分片并发上传，只有从 0 开始连续的分片才能作为续传起点
+        parts = []
+        for expected, part in enumerate(sorted(manifest["parts"], key=lambda p: p["index"])):
+            if part["index"] != expected:
+                break
+            parts.append(part)
+        manifest["parts"] = parts
+        manifest["rows"] = sum(part["rows"] for part in parts)
+        logger.info("Resuming export %s after %d parts (%d rows)", self.prefix, len(parts), manifest["rows"])
+        return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        data = json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+        if not self.oss.upload_bytes(data, self.manifest_key):
+            raise IOError(f"Failed to upload export manifest {self.manifest_key}")
+
+    # ------------------------------------------------------------------
+    # Pipeline
+    # ------------------------------------------------------------------
+    def _new_writer(self, schema_holder: Dict[str, Any]):
+        if self.format == "parquet":
+            return _ParquetPartWriter(self.compression, schema_holder, self.schema)
+        return _JsonlPartWriter(self.compression)
+
+    def _upload_part(
+        self, manifest: Dict[str, Any], index: int, data: bytes, rows: int, last_key: Optional[str]
+    ) -> None:
+        key = self._part_key(index)
+        if not self.oss.upload_bytes(data, key):
+            raise IOError(f"Failed to upload export part {key}")
+        with self._manifest_lock:
+            manifest["parts"].append(
+                {"index": index, "key": key, "rows": rows, "bytes": len(data), "last_key": last_key}
+            )
+            manifest["parts"].sort(key=lambda part: part["index"])
+            manifest["rows"] += rows
+            self._save_manifest(manifest)
+        logger.debug("Uploaded export part %s (%d rows, %d bytes)", key, rows, len(data))
+
+    def _run(
+        self, rows: Iterable[Dict[str, Any]], manifest: Dict[str, Any], key_field: Optional[str] = None
+    ) -> Dict[str, Any]:
+        index = len(manifest["parts"])
+        schema_holder: Dict[str, Any] = {}
+        slots = threading.BoundedSemaphore(self.max_concurrency)
+        futures: List[Future] = []
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="oss-export")
+
+        def submit(writer, last_row: Dict[str, Any]) -> None:
+            nonlocal index
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+            last_key = json_util.dumps(last_row[key_field]) if key_field else None
+            data = writer.finish()
+            # 上传槽位用尽时阻塞生产者，限制内存占用
+            slots.acquire()
+            future = executor.submit(self._upload_part, manifest, index, data, writer.rows, last_key)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+            index += 1
+
+        writer = None
+        last_row: Optional[Dict[str, Any]] = None
+
+        def write(batch: List[Dict[str, Any]]) -> None:
+            nonlocal writer, last_row
+            try:
+                writer.write(batch)
+            except _SchemaChanged:
+                # schema 变宽时先结束当前分片，再用合并后的 schema 开始新分片
+                submit(writer, last_row)
+                writer = self._new_writer(schema_holder)
+                writer.write(batch)
+            last_row = batch[-1]
+
+        try:
+            writer = self._new_writer(schema_holder)
+            batch: List[Dict[str, Any]] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) < self.batch_size:
+                    continue
+                write(batch)
+                batch = []
+                if writer.size() >= self.part_size:
+                    submit(writer, last_row)
+                    writer = self._new_writer(schema_holder)
+            if batch:
+                write(batch)
+            if writer.rows:
+                submit(writer, last_row)
+            for future in futures:
+                future.result()
+        finally:
+            executor.shutdown(wait=True)
+
+        with self._manifest_lock:
+            manifest["complete"] = True
+            self._save_manifest(manifest)
+        logger.info(
+            "Exported %d rows in %d parts to %s", manifest["rows"], len(manifest["parts"]), self.prefix
+        )
+        return manifest
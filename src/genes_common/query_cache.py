@@ -0,0 +1,312 @@
+"""Tag-based MySQL query result cache stored in Redis.
+
+Results of opted-in read queries are cached under a key built from the
+normalized SQL, its parameters and the current version of every table the
+query reads. Each table tag is a Redis counter; committing a session that
+wrote to a table bumps its counter, so every cached result that depends on
+it is bypassed and left to expire.
+
+Results are stored as JSON. Dates, times, decimals and bytes are tagged so
+they come back as the same Python types.
+
+Results are only stored when the query opens the session's transaction. A
+query run inside a transaction that has already started may see an older
+REPEATABLE READ snapshot than the tag versions it read. Such a query can
+still be served from the cache, but its own result is never stored.
+
+Example:
+    from genes_common import get_mysql_session
+    from genes_common.query_cache import get_query_cache
+
+    cache = get_query_cache()
+    session = get_mysql_session()
+    genes = cache.query(
+        session,
+        "SELECT * FROM genes WHERE symbol = :symbol",
+        {"symbol": "BRCA1"},
+        tables=["genes"],
+        ttl=600,
+    )
+"""
+from __future__ import annotations
+
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+import logging
+import re
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["QueryCache", "get_query_cache"]
+
+# session.info 中按 SessionTransaction 记录写过的表，None 表示事务开始前记录的
+_PENDING_TABLES_KEY = "genes_query_cache_tables"
+
+# 折叠引号外的空白，保留字符串字面量原样
+_SQL_TOKEN_RE = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")|\s+")
+_TABLE_NAME = r"`?\w+`?(?:\.`?\w+`?)?"
+_READ_TABLES_RE = re.compile(rf"\b(?:from|join)\s+({_TABLE_NAME})", re.IGNORECASE)
+# FROM a, b / FROM a x, b y 形式的逗号连接，正则只能识别第一张表
+_COMMA_JOIN_RE = re.compile(rf"\bfrom\s+{_TABLE_NAME}(?:\s+(?:as\s+)?\w+)?\s*,", re.IGNORECASE)
+_WRITE_TABLES_RE = re.compile(
+    rf"\b(?:insert\s+(?:ignore\s+)?into|replace\s+into|update|delete\s+from|truncate(?:\s+table)?)\s+({_TABLE_NAME})",
+    re.IGNORECASE,
+)
+
+
+def _normalize_sql(sql: str) -> str:
+    return _SQL_TOKEN_RE.sub(lambda m: m.group(1) or " ", sql).strip().rstrip(";").strip()
+
+
+def _table_tag(name: str) -> str:
+    """`db`.`table` -> table"""
+    return name.replace("`", "").rsplit(".", 1)[-1].lower()
+
+
+def _tables_read(sql: str) -> Set[str]:
+    if _COMMA_JOIN_RE.search(sql):
+        raise ValueError("Cannot determine the tables of a comma join in FROM; pass tables=")
+    return {_table_tag(name) for name in _READ_TABLES_RE.findall(sql)}
+
+
+def _tables_written(sql: str) -> Set[str]:
+    return {_table_tag(name) for name in _WRITE_TABLES_RE.findall(sql)}
+
+
+def _encode_value(value: Any) -> Any:
+    """JSON hook: tag the MySQL column types JSON has no type for."""
+    if isinstance(value, datetime.datetime):
+        return {"__qc__": "datetime", "v": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"__qc__": "date", "v": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"__qc__": "time", "v": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"__qc__": "timedelta", "v": value.total_seconds()}
+    if isinstance(value, decimal.Decimal):
+        return {"__qc__": "decimal", "v": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"__qc__": "bytes", "v": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+_DECODERS = {
+    "datetime": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat,
+    "time": datetime.time.fromisoformat,
+    "timedelta": lambda v: datetime.timedelta(seconds=v),
+    "decimal": decimal.Decimal,
+    "bytes": base64.b64decode,
+}
+
+
+def _decode_value(obj: Dict[str, Any]) -> Any:
+    tag = obj.get("__qc__")
+    if tag is not None and len(obj) == 2 and tag in _DECODERS:
+        return _DECODERS[tag](obj["v"])
+    return obj
+
+
+def _dumps_rows(rows: List[Dict[str, Any]]) -> bytes:
+    return json.dumps(rows, default=_encode_value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads_rows(data: bytes) -> List[Dict[str, Any]]:
+    return json.loads(data, object_hook=_decode_value)
+
+
+class QueryCache:
+    """Redis-backed query result cache with table-level tag invalidation."""
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        prefix: Optional[str] = None,
+        default_ttl: Optional[int] = None,
+    ) -> None:
+        if redis_client is None:
+            from .db import get_redis_client
+            redis_client = get_redis_client()
+        self.redis = redis_client
+        self.prefix = prefix or settings.database.mysql_query_cache_prefix
+        self.default_ttl = default_ttl if default_ttl is not None else settings.database.mysql_query_cache_ttl
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+    def query(
+        self,
+        session: Session,
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+        tables: Optional[Iterable[str]] = None,
+        ttl: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Run ``sql`` through ``session``, serving the rows from Redis when possible.
+
+        ``tables`` lists the tables the query depends on; when omitted they
+        are taken from the FROM/JOIN clauses (comma joins need ``tables=``).
+        Queries touching tables that ``session`` has written in its open
+        transaction bypass the cache. The result is only stored when the
+        query starts the session's transaction; see the module docstring.
+        """
+        tags = sorted({_table_tag(name) for name in tables} if tables is not None else _tables_read(sql))
+        if not tags:
+            raise ValueError("Cannot determine the tables read by the query; pass tables=")
+
+        pending = session.info.get(_PENDING_TABLES_KEY, {})
+        if any(written.intersection(tags) for written in pending.values()):
+            return self._execute(session, sql, params)
+        # 已开始的事务可能持有早于 tag 版本的快照，结果不能写入缓存
+        fill = not session.in_transaction()
+
+        try:
+            key = self._result_key(sql, params, tags)
+            cached = self.redis.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Query cache unavailable, querying MySQL directly: {e}")
+            return self._execute(session, sql, params)
+        if cached is not None:
+            try:
+                return _loads_rows(cached)
+            except ValueError as e:
+                logger.warning(f"Discarding unreadable cached query result {key}: {e}")
+
+        rows = self._execute(session, sql, params)
+        if not fill:
+            return rows
+        try:
+            self.redis.set(key, _dumps_rows(rows), ex=ttl if ttl is not None else self.default_ttl)
+        except TypeError as e:
+            logger.warning(f"Query result is not cacheable: {e}")
+        except redis.RedisError as e:
+            logger.warning(f"Failed to store query result in cache: {e}")
+        return rows
+
+    @staticmethod
+    def _execute(session: Session, sql: str, params: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        result = session.execute(text(sql), params or {})
+        return [dict(row._mapping) for row in result]
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def _result_key(self, sql: str, params: Optional[Dict[str, Any]], tags: List[str]) -> str:
+        # 单独 GET 的 pipeline 在 Cluster 模式下也可跨 slot 执行
+        pipeline = self.redis.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.get(self._tag_key(tag))
+        versions = [version or "0" for version in pipeline.execute()]
+
+        digest = hashlib.sha1()
+        digest.update(_normalize_sql(sql).encode("utf-8"))
+        digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(",".join(f"{tag}={version}" for tag, version in zip(tags, versions)).encode("utf-8"))
+        return f"{self.prefix}:q:{digest.hexdigest()}"
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    def invalidate(self, *tables: str) -> None:
+        """Invalidate every cached result that depends on ``tables``."""
+        tags = sorted({_table_tag(name) for name in tables})
+        if not tags:
+            return
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for tag in tags:
+                pipeline.incr(self._tag_key(tag))
+            pipeline.execute()
+            logger.debug(f"Invalidated query cache tags: {tags}")
+        except redis.RedisError as e:
+            logger.error(f"Failed to invalidate query cache tags {tags}: {e}")
+
+    def install(self, target: Any = Session) -> None:
+        """Listen to session events on ``target`` (Session class or a sessionmaker).
+
+        Tables written by flushed ORM objects and by INSERT/UPDATE/DELETE
+        statements are recorded per transaction. A committed SAVEPOINT hands
+        its tables to the enclosing transaction, a rolled back one drops
+        them, and only the outermost commit invalidates.
+        """
+        for name, listener in (
+            ("after_flush", self._after_flush),
+            ("do_orm_execute", self._do_orm_execute),
+            ("after_commit", self._after_commit),
+            ("after_transaction_end", self._after_transaction_end),
+        ):
+            if not event.contains(target, name, listener):
+                event.listen(target, name, listener)
+
+    @staticmethod
+    def _current_transaction(session: Session) -> Any:
+        return session.get_nested_transaction() or session.get_transaction()
+
+    def _record(self, session: Session, tables: Iterable[str]) -> None:
+        pending = session.info.setdefault(_PENDING_TABLES_KEY, {})
+        pending.setdefault(self._current_transaction(session), set()).update(_table_tag(name) for name in tables)
+
+    def _after_flush(self, session: Session, flush_context: Any) -> None:
+        tables = set()
+        for obj in chain(session.new, session.dirty, session.deleted):
+            tables.update(table.name for table in inspect(obj).mapper.tables)
+        self._record(session, tables)
+
+    def _do_orm_execute(self, orm_execute_state: Any) -> None:
+        if orm_execute_state.is_select:
+            return
+        statement = orm_execute_state.statement
+        table = getattr(statement, "table", None)
+        if table is not None and getattr(table, "name", None):
+            self._record(orm_execute_state.session, [table.name])
+        else:
+            self._record(orm_execute_state.session, _tables_written(str(statement)))
+
+    def _after_commit(self, session: Session) -> None:
+        # after_commit 对 SAVEPOINT 也会触发，此时提交的是最内层事务
+        pending = session.info.get(_PENDING_TABLES_KEY)
+        if not pending:
+            return
+        transaction = self._current_transaction(session)
+        tables = pending.pop(transaction, set())
+        if transaction is not None and transaction.nested:
+            if tables:
+                pending.setdefault(transaction.parent, set()).update(tables)
+            return
+        tables.update(pending.pop(None, ()))
+        if tables:
+            self.invalidate(*tables)
+
+    def _after_transaction_end(self, session: Session, transaction: Any) -> None:
+        # 已提交的表在 after_commit 中取走，剩下的属于回滚的事务
+        pending = session.info.get(_PENDING_TABLES_KEY)
+        if not pending:
+            return
+        pending.pop(transaction, None)
+        if transaction.parent is None:
+            pending.pop(None, None)
+
+
+_query_cache: Optional[QueryCache] = None
+
+
+def get_query_cache() -> QueryCache:
+    """Get the shared QueryCache, installed on all SQLAlchemy sessions."""
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = QueryCache()
+        _query_cache.install()
+    return _query_cache
@@ -0,0 +1,323 @@
+"""Memory-mapped reference data shared by all worker processes on a node.
+
+Large lookup tables (gene symbol maps, transcript coordinates, ...) are
+materialized once per node into a read-only file with a sorted key index.
+Every gunicorn/Celery worker maps the same file, so the data is held once in
+the page cache instead of once per process, and lookups binary-search the
+index without copying or decoding the whole table.
+
+Tables are versioned: ``<REFDATA_DIR>/<name>/<version>.tbl`` holds the data
+and ``<REFDATA_DIR>/<name>/CURRENT`` names the active version. A new version
+is built under a file lock by a single process and published with an atomic
+rename; workers pick it up with ``ReferenceTable.refresh()``.
+
+REFDATA_DIR defaults to the disk-backed ``/var/tmp/genes-refdata``. Mapped
+pages still live once in the page cache. ``/dev/shm`` avoids the disk
+entirely, but Docker limits it to 64MB unless the container runs with a
+larger ``--shm-size``.
+
+Example:
+    from genes_common import get_mongo_db
+    from genes_common.refdata import load_reference_table, mongo_items
+
+    symbols = load_reference_table(
+        "gene_symbols",
+        lambda: mongo_items(get_mongo_db().genes, "symbol", {"_id": 0, "symbol": 1, "hgnc_id": 1}),
+        version="2024-06",
+    )
+    symbols["BRCA1"]  # {"symbol": "BRCA1", "hgnc_id": "HGNC:1100"}
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["ReferenceTable", "load_reference_table", "build_reference_table", "mongo_items"]
+
+# magic, format version, count, key offsets, key data, value offsets, value data
+_HEADER = struct.Struct("=4sIQQQQQ")
+_MAGIC = b"GNRF"
+_FORMAT_VERSION = 1
+_CURRENT = "CURRENT"
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def _align8(position: int) -> int:
+    return (position + 7) & ~7
+
+
+def _safe_name(value: str) -> str:
+    return _SAFE_NAME_RE.sub("_", value)
+
+
+def _encode_key(key: Any) -> bytes:
+    return key if isinstance(key, bytes) else str(key).encode("utf-8")
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def mongo_items(
+    collection: Any,
+    key_field: str,
+    projection: Optional[Dict[str, Any]] = None,
+    query: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+    """Yield ``(doc[key_field], doc)`` pairs from a Mongo collection."""
+    for doc in collection.find(query or {}, projection, batch_size=5000):
+        yield doc[key_field], doc
+
+
+def _write_table(path: str, items: Iterable[Tuple[Any, Any]]) -> int:
+    """Write ``items`` sorted by key; later duplicates win. Returns the row count."""
+    encoded: Dict[bytes, bytes] = {}
+    for key, value in items:
+        encoded[_encode_key(key)] = json.dumps(
+            value, default=_json_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+    keys = sorted(encoded)
+    count = len(keys)
+
+    key_offsets = array("Q", [0])
+    value_offsets = array("Q", [0])
+    for key in keys:
+        key_offsets.append(key_offsets[-1] + len(key))
+        value_offsets.append(value_offsets[-1] + len(encoded[key]))
+
+    key_offsets_pos = _align8(_HEADER.size)
+    key_data_pos = key_offsets_pos + 8 * (count + 1)
+    value_offsets_pos = _align8(key_data_pos + key_offsets[-1])
+    value_data_pos = value_offsets_pos + 8 * (count + 1)
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(
+            _MAGIC, _FORMAT_VERSION, count,
+            key_offsets_pos, key_data_pos, value_offsets_pos, value_data_pos,
+        ))
+        f.write(b"\0" * (key_offsets_pos - _HEADER.size))
+        f.write(key_offsets.tobytes())
+        for key in keys:
+            f.write(key)
+        f.write(b"\0" * (value_offsets_pos - key_data_pos - key_offsets[-1]))
+        f.write(value_offsets.tobytes())
+        for key in keys:
+            f.write(encoded[key])
+        f.flush()
+        os.fsync(f.fileno())
+    return count
+
+
+class _MappedTable:
+    """One mapped version of a table."""
+
+    def __init__(self, path: str, version: str) -> None:
+        self.path = path
+        self.version = version
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, count, key_offsets_pos, key_data_pos, value_offsets_pos, value_data_pos = (
+            _HEADER.unpack_from(self._mmap, 0)
+        )
+        if magic != _MAGIC or fmt != _FORMAT_VERSION:
+            raise ValueError(f"{path} is not a reference table (format {fmt})")
+
+        buffer = memoryview(self._mmap)
+        self.count = count
+        self._key_offsets = buffer[key_offsets_pos:key_data_pos].cast("Q")
+        self._keys = buffer[key_data_pos:value_offsets_pos]
+        self._value_offsets = buffer[value_offsets_pos:value_data_pos].cast("Q")
+        self._values = buffer[value_data_pos:]
+
+    def key_at(self, index: int) -> bytes:
+        return self._keys[self._key_offsets[index]:self._key_offsets[index + 1]].tobytes()
+
+    def value_at(self, index: int) -> Any:
+        return json.loads(self._values[self._value_offsets[index]:self._value_offsets[index + 1]].tobytes())
+
+    def find(self, key: bytes) -> int:
+        """Binary search for ``key``; returns its index or -1."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self.key_at(lo) == key:
+            return lo
+        return -1
+
+
+class ReferenceTable:
+    """Read-only, memory-mapped mapping from string keys to JSON values.
+
+    Follows the published CURRENT version by default; passing ``version``
+    pins the table to that version file instead.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None, version: Optional[str] = None) -> None:
+        self.name = name
+        self.directory = os.path.join(directory or settings.database.refdata_dir, _safe_name(name))
+        self.pinned = version is not None
+        self._table: Optional[_MappedTable] = None
+        if self.pinned:
+            path = _table_path(self.directory, version)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Reference table '{name}' version {version} has not been built in {self.directory}")
+            self._table = _MappedTable(path, version)
+        elif not self.refresh():
+            raise FileNotFoundError(f"Reference table '{name}' has not been built in {self.directory}")
+
+    @property
+    def version(self) -> str:
+        return self._table.version
+
+    def refresh(self) -> bool:
+        """Map the current version if it changed. Returns False if no version is published.
+
+        Pinned tables keep their version and always return True.
+        """
+        if self.pinned:
+            return True
+        version = _read_current(self.directory)
+        if version is None:
+            return False
+        if self._table is None or self._table.version != version:
+            # 单次赋值切换，并发读取的线程总能看到完整的旧表或新表
+            self._table = _MappedTable(_table_path(self.directory, version), version)
+            logger.info("Mapped reference table %s version %s (%d keys)", self.name, version, self._table.count)
+        return True
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        table = self._table
+        index = table.find(_encode_key(key))
+        return default if index < 0 else table.value_at(index)
+
+    def __getitem__(self, key: Any) -> Any:
+        table = self._table
+        index = table.find(_encode_key(key))
+        if index < 0:
+            raise KeyError(key)
+        return table.value_at(index)
+
+    def __contains__(self, key: Any) -> bool:
+        return self._table.find(_encode_key(key)) >= 0
+
+    def __len__(self) -> int:
+        return self._table.count
+
+    def keys(self) -> Iterator[str]:
+        table = self._table
+        for index in range(table.count):
+            yield table.key_at(index).decode("utf-8")
+
+
+def _table_path(directory: str, version: str) -> str:
+    return os.path.join(directory, f"{_safe_name(version)}.tbl")
+
+
+def _read_current(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, _CURRENT), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def build_reference_table(
+    name: str,
+    items: Iterable[Tuple[Any, Any]],
+    version: str,
+    directory: Optional[str] = None,
+    keep_versions: int = 2,
+    publish: bool = True,
+) -> str:
+    """Write ``items`` as ``version`` of table ``name`` and publish it atomically.
+
+    With ``publish=False`` the file is written but CURRENT is left alone.
+    Older version files beyond ``keep_versions`` are removed, except the one
+    CURRENT names; processes that still map them keep working until they
+    refresh. Returns the table path.
+    """
+    table_dir = os.path.join(directory or settings.database.refdata_dir, _safe_name(name))
+    os.makedirs(table_dir, exist_ok=True)
+    path = _table_path(table_dir, version)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        count = _write_table(tmp_path, items)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    if publish:
+        current_tmp = os.path.join(table_dir, f"{_CURRENT}.{os.getpid()}.tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp, os.path.join(table_dir, _CURRENT))
+        logger.info("Published reference table %s version %s (%d keys)", name, version, count)
+    else:
+        logger.info("Built reference table %s version %s (%d keys)", name, version, count)
+
+    current = _read_current(table_dir)
+    current_path = _table_path(table_dir, current) if current is not None else None
+    versions: List[Tuple[float, str]] = []
+    for entry in os.scandir(table_dir):
+        if entry.name.endswith(".tbl") and entry.path not in (path, current_path):
+            versions.append((entry.stat().st_mtime, entry.path))
+    for _, old_path in sorted(versions, reverse=True)[max(keep_versions - 1, 0):]:
+        os.unlink(old_path)
+    return path
+
+
+def load_reference_table(
+    name: str,
+    loader: Callable[[], Iterable[Tuple[Any, Any]]],
+    version: str,
+    directory: Optional[str] = None,
+    publish: Optional[bool] = None,
+) -> ReferenceTable:
+    """Map table ``name`` pinned at ``version``, building it first if this node lacks it.
+
+    An existing ``<version>.tbl`` is mapped as is, whatever CURRENT names, so
+    callers asking for different versions never republish each other's.
+    Versions are opaque strings, so a rebuilt version cannot be known to be
+    newer than CURRENT. It may be an old version that was pruned and is
+    requested again during a rolling deploy. By default (``publish=None``)
+    a built version is only published when nothing is published yet. Pass
+    ``publish=True`` (or use ``build_reference_table``) to move CURRENT.
+    Only one process per node runs ``loader``; concurrent callers wait on a
+    file lock and then map the built file.
+    """
+    table_dir = os.path.join(directory or settings.database.refdata_dir, _safe_name(name))
+    path = _table_path(table_dir, version)
+    if not os.path.exists(path):
+        os.makedirs(table_dir, exist_ok=True)
+        with open(os.path.join(table_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(path):
+                    if publish is None:
+                        publish = _read_current(table_dir) is None
+                    build_reference_table(name, loader(), version, directory, publish=publish)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return ReferenceTable(name, directory, version=version)
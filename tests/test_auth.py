@@ -0,0 +1,198 @@
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+import redis
+
+from genes_common import auth
+from genes_common.auth import (
+    ExpiredTokenError,
+    InvalidTokenError,
+    RevocationUnavailableError,
+    RevokedTokenError,
+    TokenVerifier,
+)
+
+SECRET = "test-secret-key"
+NOW = 1_700_000_000
+
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def forge(payload, header=None, secret=SECRET, digestmod=hashlib.sha256):
+    """Build a token by hand so tests do not depend on TokenVerifier.encode."""
+    header = header if header is not None else {"alg": "HS256", "typ": "JWT"}
+    signing_input = f"{b64(json.dumps(header).encode())}.{b64(json.dumps(payload).encode())}"
+    signature = hmac.new(secret.encode(), signing_input.encode(), digestmod).digest()
+    return f"{signing_input}.{b64(signature)}"
+
+
+class FakeRevocationSet:
+    def __init__(self, revoked=(), error=None):
+        self.ids = set(revoked)
+        self.error = error
+        self.calls = 0
+
+    def revoked(self, token_ids):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return [token_id in self.ids for token_id in token_ids]
+
+    def revoke(self, token_id, expires_at=None):
+        self.ids.add(token_id)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr(auth.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def verifier(clock):
+    return TokenVerifier(SECRET, "HS256", cache_size=100, leeway=0)
+
+
+def test_valid_token_round_trip(verifier):
+    token = verifier.encode({"sub": "user-1"}, expires_in=60)
+    claims = verifier.verify(token)
+    assert claims["sub"] == "user-1"
+    assert claims["exp"] == NOW + 60
+    assert verifier.verify(forge({"sub": "user-2", "exp": NOW + 60}))["sub"] == "user-2"
+
+
+def test_tampered_signature_is_rejected(verifier):
+    token = forge({"sub": "user-1", "exp": NOW + 60})
+    signing_input, _, signature = token.rpartition(".")
+    flipped = ("A" if signature[0] != "A" else "B") + signature[1:]
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(f"{signing_input}.{flipped}")
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(forge({"sub": "user-1", "exp": NOW + 60}, secret="other-secret"))
+
+
+def test_tampered_payload_is_rejected(verifier):
+    token = forge({"sub": "user-1", "exp": NOW + 60})
+    header, _, signature = token.split(".")
+    payload = b64(json.dumps({"sub": "admin", "exp": NOW + 60}).encode())
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(f"{header}.{payload}.{signature}")
+
+
+@pytest.mark.parametrize("header", [
+    {"alg": "HS512", "typ": "JWT"},
+    {"alg": "none", "typ": "JWT"},
+    {"typ": "JWT"},
+])
+def test_algorithm_mismatch_is_rejected(verifier, header):
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(forge({"sub": "user-1", "exp": NOW + 60}, header=header))
+
+
+def test_unsigned_none_token_is_rejected(verifier):
+    header = b64(json.dumps({"alg": "none", "typ": "JWT"}).encode())
+    payload = b64(json.dumps({"sub": "user-1", "exp": NOW + 60}).encode())
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(f"{header}.{payload}.")
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda token: token + "!!",
+    lambda token: token.replace(".", ".*", 1),
+    lambda token: token[:10] + "+" + token[11:],
+    lambda token: token + "=",
+    lambda token: token.rpartition(".")[0],
+])
+def test_malformed_segments_are_rejected(verifier, mutate):
+    token = forge({"sub": "user-1", "exp": NOW + 60})
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(mutate(token))
+
+
+@pytest.mark.parametrize("claims", [
+    {"exp": "tomorrow"},
+    {"exp": None},
+    {"exp": True},
+    {"exp": NOW + 60, "nbf": "now"},
+    {"exp": NOW + 60, "nbf": None},
+])
+def test_non_numeric_time_claims_are_rejected(verifier, claims):
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(forge(claims))
+
+
+def test_expired_and_not_yet_valid_tokens_are_rejected(verifier):
+    with pytest.raises(ExpiredTokenError):
+        verifier.verify(forge({"exp": NOW - 1}))
+    with pytest.raises(ExpiredTokenError):
+        verifier.verify(forge({"exp": NOW + 60, "nbf": NOW + 30}))
+
+
+def test_expired_token_is_not_served_from_cache(verifier, clock):
+    token = forge({"sub": "user-1", "exp": NOW + 60})
+    verifier.verify(token)
+    assert len(verifier._cache) == 1
+
+    clock[0] = NOW + 61
+    with pytest.raises(ExpiredTokenError):
+        verifier.verify(token)
+    assert len(verifier._cache) == 0
+
+
+def test_token_without_exp_is_not_cached(verifier, clock):
+    token = forge({"sub": "user-1"})
+    assert verifier.verify(token)["sub"] == "user-1"
+    assert len(verifier._cache) == 0
+
+
+def test_require_exp_rejects_token_without_exp(clock):
+    strict = TokenVerifier(SECRET, "HS256", require_exp=True)
+    with pytest.raises(InvalidTokenError):
+        strict.verify(forge({"sub": "user-1"}))
+
+
+def test_returned_claims_do_not_alias_the_cache(verifier):
+    token = forge({"sub": "user-1", "exp": NOW + 60})
+    verifier.verify(token)["sub"] = "admin"
+    assert verifier.verify(token)["sub"] == "user-1"
+
+
+def test_revoked_token_is_rejected(clock):
+    revocation = FakeRevocationSet(revoked={"token-1"})
+    verifier = TokenVerifier(SECRET, "HS256", revocation=revocation, revocation_check_interval=30)
+    with pytest.raises(RevokedTokenError):
+        verifier.verify(forge({"jti": "token-1", "exp": NOW + 60}))
+    assert verifier.verify(forge({"jti": "token-2", "exp": NOW + 60}))["jti"] == "token-2"
+
+
+def test_cached_token_is_rechecked_after_interval(clock):
+    revocation = FakeRevocationSet()
+    verifier = TokenVerifier(SECRET, "HS256", revocation=revocation, revocation_check_interval=30)
+    token = forge({"jti": "token-1", "exp": NOW + 600})
+    verifier.verify(token)
+    verifier.verify(token)
+    assert revocation.calls == 1
+
+    revocation.ids.add("token-1")
+    clock[0] = NOW + 31
+    with pytest.raises(RevokedTokenError):
+        verifier.verify(token)
+
+
+def test_revocation_backend_error_fails_closed(clock):
+    revocation = FakeRevocationSet(error=redis.ConnectionError("redis is down"))
+    verifier = TokenVerifier(SECRET, "HS256", revocation=revocation)
+    token = forge({"jti": "token-1", "exp": NOW + 60})
+
+    with pytest.raises(RevocationUnavailableError):
+        verifier.verify(token)
+    results = verifier.verify_many([token, token + "!!"], return_exceptions=True)
+    assert isinstance(results[0], RevocationUnavailableError)
+    assert isinstance(results[1], InvalidTokenError)
+    assert len(verifier._cache) == 0